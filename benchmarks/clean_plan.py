@@ -0,0 +1,67 @@
+# import libraries
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+# make the data and benchmarks packages importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from benchmarks import legacy_clean  # noqa: E402
+from data import process_data  # noqa: E402
+from data.schema import compact  # noqa: E402
+
+
+def time_clean(clean_data, raw, repeats):
+    """
+    Time a clean_data implementation, every run cleans a fresh copy of the raw dataset
+
+    INPUT
+    clean_data - function cleaning a dataset
+    raw - Pandas.DataFrame as read from data.csv
+    repeats - number of timed runs
+
+    OUTPUT
+    timings - list of seconds per run
+    dataset - Pandas.DataFrame cleaned by the last run
+    """
+    timings = []
+
+    for _ in range(repeats):
+        dataset = raw.copy()
+
+        start = time.perf_counter()
+        dataset = clean_data(dataset)
+        timings.append(time.perf_counter() - start)
+
+    return timings, dataset
+
+
+def main(input_path, repeats):
+    print(f'Loading {input_path}...')
+    raw = pd.read_csv(input_path)
+
+    legacy_timings, legacy = time_clean(legacy_clean.clean_data, raw, repeats)
+    plan_timings, plan = time_clean(process_data.clean_data, raw, repeats)
+
+    # the plan also casts to the compact schema, which the legacy steps predate
+    if compact(legacy).to_csv(index=False) != plan.to_csv(index=False):
+        print('The cleaning plan output differs from the legacy cleaning steps')
+
+        sys.exit(1)
+
+    print(f'{raw.shape[0]} rows, best of {repeats} runs, outputs are identical')
+    print(f'legacy steps:  {min(legacy_timings) * 1000:8.1f}ms')
+    print(f'cleaning plan: {min(plan_timings) * 1000:8.1f}ms')
+    print(f'speedup:       {min(legacy_timings) / min(plan_timings):8.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare the cleaning plan with the legacy cleaning steps')
+    parser.add_argument('--input', dest='input_path', default=os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'data.csv'), help='raw csv to clean')
+    parser.add_argument('--repeats', type=int, default=5, help='timed runs per implementation')
+
+    main(**vars(parser.parse_args()))
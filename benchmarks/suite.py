@@ -0,0 +1,359 @@
+# import libraries
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# make the data, models and web packages importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data import generate_data, process_data  # noqa: E402
+from models import train_classifier  # noqa: E402
+from web.providers.MLPPredictor import MLPPredictor  # noqa: E402
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BASELINE_PATH = f'{BENCHMARKS_DIR}/baseline.json'
+
+# predictions per timed run, small batches are scored this many samples' worth of times
+PREDICT_SAMPLES = 20000
+
+
+def measure(function, setup=None, repeats=3, work=1):
+    """
+    Time a function over several runs, then run it once more under tracemalloc for its peak memory
+
+    INPUT
+    function - function called with the arguments setup returns
+    setup - function returning the (fresh) arguments of every run, untimed, e.g. a copy of a dataset cleaned in place
+    repeats - number of timed runs
+    work - rows or samples a run processes, for the throughput
+
+    OUTPUT
+    result - dict with the seconds of every run, their mean, standard deviation and coefficient of variation, the
+        throughput of the fastest run and the peak traced bytes
+    value - what the last timed run returned
+    """
+    setup = setup or (lambda: ())
+
+    seconds = []
+
+    for _ in range(repeats):
+        arguments = setup()
+
+        start = time.perf_counter()
+        value = function(*arguments)
+        seconds.append(time.perf_counter() - start)
+
+    # tracing slows allocations down, so the memory run is not timed
+    arguments = setup()
+
+    tracemalloc.start()
+
+    try:
+        function(*arguments)
+
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    mean = statistics.mean(seconds)
+    stdev = statistics.stdev(seconds) if len(seconds) > 1 else 0.0
+
+    result = {
+        'repeats': repeats,
+        'seconds': seconds,
+        'min_seconds': min(seconds),
+        'mean_seconds': mean,
+        'stdev_seconds': stdev,
+        'cv': stdev / mean if mean else 0.0,
+        'throughput': work / min(seconds),
+        'peak_bytes': peak_bytes,
+    }
+
+    return result, value
+
+
+def quietly(function):
+    """
+    Wrap a function so what it prints, e.g. the training progress, does not end up in the benchmark output
+    """
+    def wrapped(*args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return function(*args)
+
+    return wrapped
+
+
+def benchmark_etl(size, repeats, work_dir, profile, seed):
+    """
+    Time loading, cleaning and saving a generated raw dataset
+
+    OUTPUT
+    results - list of benchmark results
+    """
+    raw_path = f'{work_dir}/data.csv'
+
+    generate_data.save_csv(generate_data.generate_blocks(profile, size, seed, profile['status_share']), raw_path)
+
+    load, raw = measure(lambda: process_data.load_data(file_path=raw_path), repeats=repeats, work=size)
+
+    clean, dataset = measure(process_data.clean_data, setup=lambda: (raw.copy(),), repeats=repeats, work=size)
+
+    save, _ = measure(lambda: process_data.save_data(dataset, data_dir=work_dir), repeats=repeats, work=size)
+
+    return [
+        {'name': 'process_data.load_data', 'size': size, 'unit': 'rows/s', **load},
+        {'name': 'process_data.clean_data', 'size': size, 'unit': 'rows/s', **clean},
+        {'name': 'process_data.save_data', 'size': size, 'unit': 'rows/s', **save},
+    ]
+
+
+def benchmark_training(size, repeats, work_dir):
+    """
+    Time loading the processed dataset saved by benchmark_etl and fitting the classifier. Loading bypasses the split
+    cache, it times splitting and scaling
+
+    The number of epochs build_model runs before early stopping varies between runs, so its throughput is samples
+    (rows x epochs) per second of the fastest run rather than rows per second.
+
+    OUTPUT
+    results - list of benchmark results
+    classifier - the classifier fitted by the last run
+    X_test - Pandas.DataFrame
+    """
+    load, (dataset, X_train, X_test, y_train, y_test, scaler) = measure(
+        lambda: train_classifier.load_data(data_dir=work_dir, cache=False), repeats=repeats, work=size)
+
+    fits = []
+
+    def build_model():
+        classifier = quietly(train_classifier.build_model)(X_train, X_test, y_train, y_test)
+
+        fits.append(classifier.n_iter_)
+
+        return classifier
+
+    build, classifier = measure(build_model, repeats=repeats, work=X_train.shape[0])
+
+    samples = [X_train.shape[0] * epochs for epochs in fits[:repeats]]
+
+    build.update(
+        throughput=max(work / seconds for work, seconds in zip(samples, build['seconds'])),
+        epochs=fits[:repeats],
+    )
+
+    return [
+        {'name': 'train_classifier.load_data', 'size': size, 'unit': 'rows/s', **load},
+        {'name': 'train_classifier.build_model', 'size': size, 'unit': 'samples/s', **build},
+    ], classifier, X_test
+
+
+def benchmark_predict(size, batch_sizes, repeats, classifier, X_test):
+    """
+    Time scoring batches with the fitted MLPClassifier and with the NumPy forward pass the web app serves
+
+    OUTPUT
+    results - list of benchmark results
+    """
+    predictor = MLPPredictor(
+        coefs=classifier.coefs_,
+        intercepts=classifier.intercepts_,
+        activation=classifier.activation,
+        out_activation=classifier.out_activation_,
+        classes=classifier.classes_,
+    )
+
+    X = X_test.to_numpy()
+
+    results = []
+
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % X.shape[0]]
+
+        calls = max(1, PREDICT_SAMPLES // batch_size)
+
+        for name, predict in [('classifier.predict', classifier.predict), ('MLPPredictor.predict', predictor.predict)]:
+            def run():
+                for _ in range(calls):
+                    predict(batch)
+
+            result, _ = measure(run, repeats=repeats, work=calls * batch_size)
+
+            results.append({'name': name, 'size': size, 'batch_size': batch_size, 'unit': 'samples/s', **result})
+
+    return results
+
+
+def benchmark_key(result):
+    key = f"{result['name']}/{result['size']}"
+
+    return f"{key}/{result['batch_size']}" if 'batch_size' in result else key
+
+
+def compare(results, baseline, tolerance, memory_tolerance):
+    """
+    Compare results with a baseline
+
+    INPUT
+    results, baseline - lists of benchmark results
+    tolerance - allowed relative drop in throughput, e.g. 0.2 for 20%
+    memory_tolerance - allowed relative growth of the peak memory
+
+    OUTPUT
+    regressions - list of messages, one per regressed benchmark
+    """
+    baseline = {benchmark_key(result): result for result in baseline}
+
+    regressions = []
+
+    for result in results:
+        key = benchmark_key(result)
+
+        if key not in baseline:
+            continue
+
+        previous = baseline[key]
+
+        if result['throughput'] < previous['throughput'] * (1 - tolerance):
+            regressions.append(f"{key}: {result['throughput']:,.0f} {result['unit']}, the baseline is "
+                               f"{previous['throughput']:,.0f} "
+                               f"({result['throughput'] / previous['throughput'] - 1:+.0%})")
+
+        if result['peak_bytes'] > previous['peak_bytes'] * (1 + memory_tolerance):
+            regressions.append(f"{key}: peak memory {result['peak_bytes'] / 1e6:.1f}MB, the baseline is "
+                               f"{previous['peak_bytes'] / 1e6:.1f}MB "
+                               f"({result['peak_bytes'] / previous['peak_bytes'] - 1:+.0%})")
+
+    return regressions
+
+
+def print_results(results, baseline):
+    baseline = {benchmark_key(result): result for result in baseline or []}
+
+    print()
+    print(f"{'benchmark':<48}{'throughput':>16}{'unit':>11}{'min s':>10}{'cv':>8}{'peak MB':>10}{'vs base':>9}")
+
+    for result in results:
+        key = benchmark_key(result)
+
+        change = (f"{result['throughput'] / baseline[key]['throughput'] - 1:+.0%}" if key in baseline else '')
+
+        print(f"{key:<48}{result['throughput']:>16,.0f}{result['unit']:>11}{result['min_seconds']:>10.4f}"
+              f"{result['cv']:>8.1%}{result['peak_bytes'] / 1e6:>10.1f}{change:>9}")
+
+
+def machine():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+        'python': sys.version.split()[0],
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def main(sizes, train_sizes, batch_sizes, repeats, seed, tolerance, memory_tolerance, baseline_path, save_baseline,
+         output):
+    print('Learning the raw data profile...')
+    profile = generate_data.learn_profile(process_data.raw_file_path())
+
+    results = []
+
+    work_dir = tempfile.mkdtemp(prefix='benchmarks-')
+
+    try:
+        for size in sorted(set(sizes) | set(train_sizes)):
+            print(f'Benchmarking {size} rows...')
+
+            results += benchmark_etl(size, repeats, work_dir, profile, seed)
+
+            if size not in train_sizes:
+                continue
+
+            training, classifier, X_test = benchmark_training(size, repeats, work_dir)
+
+            results += training
+            results += benchmark_predict(size, batch_sizes, repeats, classifier, X_test)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'machine': machine(),
+        'seed': seed,
+        'results': results,
+    }
+
+    baseline = None
+
+    if os.path.exists(baseline_path) and not save_baseline:
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+
+    print_results(results, baseline['results'] if baseline else None)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(report, file, indent=4)
+
+    if save_baseline:
+        with open(baseline_path, 'w') as file:
+            json.dump(report, file, indent=4)
+
+        print(f'\nBaseline saved to {baseline_path}')
+
+        return
+
+    if baseline is None:
+        print(f'\nNo baseline at {baseline_path}, run with --save-baseline to store one')
+
+        return
+
+    if baseline['machine'] != report['machine']:
+        print('\nThe baseline was recorded on another machine or with other package versions')
+
+    regressions = compare(results, baseline['results'], tolerance, memory_tolerance)
+
+    if regressions:
+        print(f'\n{len(regressions)} regressions past the tolerance:')
+
+        for regression in regressions:
+            print(f'  {regression}')
+
+        sys.exit(1)
+
+    print('\nNo regressions')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Benchmark the ETL, training and prediction hot paths on generated data against a baseline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20000, 200000], help='raw rows the ETL is timed at')
+    parser.add_argument('--train-sizes', type=int, nargs='*', default=[20000],
+                        help='raw rows training and prediction are timed at')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64, 4096], help='prediction batch sizes')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per benchmark')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the generated data')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='relative throughput drop from the baseline that fails the run')
+    parser.add_argument('--memory-tolerance', type=float, default=0.1,
+                        help='relative peak memory growth from the baseline that fails the run')
+    parser.add_argument('--baseline', dest='baseline_path', default=BASELINE_PATH, help='baseline json')
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the new baseline')
+    parser.add_argument('--output', default=None, help='also write the results to this json file')
+
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,336 @@
+# import libraries
+import json
+import os
+import shutil
+import uuid
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_FILE = 'schema.json'
+
+
+class ColumnarWriter:
+    """
+    Write a dataset to a columnar store, one raw little endian binary file per column plus a schema file
+
+    Store layout:
+
+    processed_data/
+        schema.json             - column names and dtypes, and the parts that make up the dataset
+        part-<id>/<column>.bin  - the column values of one part
+
+    Categorical columns are stored as their integer codes, their categories are listed in the schema and have to be the
+    same in every chunk.
+
+    Chunks are appended to a new part as they arrive, so the full dataset never has to be in memory. The part only
+    becomes visible to readers once commit() rewrites schema.json, which is replaced atomically.
+    """
+
+    def __init__(self, path, append=False, partition=None):
+        self.path = path
+        self.append = append
+        self.partition = partition or {}
+
+        self.part = f'part-{uuid.uuid4().hex[:12]}'
+        self.columns = None
+        self.rows = 0
+
+        os.makedirs(f'{self.path}/{self.part}')
+
+    def write(self, chunk):
+        if self.columns is None:
+            self.columns = [column_schema(chunk[column]) for column in chunk.columns]
+
+            schema = read_schema(self.path) if self.append else None
+
+            # appended parts are read with the dtypes of the schema
+            if schema is not None and schema['columns'] != self.columns:
+                raise ValueError(f'cannot append to {self.path}, the columns or their dtypes do not match')
+
+        for column in self.columns:
+            series = chunk[column['name']]
+
+            if column_schema(series) != column:
+                raise ValueError(f"{column['name']} is {column_dtype(series)} in this chunk, the part stores it as "
+                                 f"{column['dtype']} (or with other categories)")
+
+            if 'categories' in column:
+                series = series.cat.codes
+
+            values = np.ascontiguousarray(series.to_numpy(dtype=column['dtype']))
+
+            with open(f"{self.path}/{self.part}/{column['name']}.bin", 'ab') as file:
+                file.write(values.tobytes())
+
+        self.rows += chunk.shape[0]
+
+    def info(self):
+        return {'name': self.part, 'rows': self.rows, 'partition': self.partition}
+
+    def commit(self):
+        commit_parts(self.path, [self.info()], self.columns, append=self.append)
+
+    def abort(self):
+        shutil.rmtree(f'{self.path}/{self.part}', ignore_errors=True)
+
+
+def commit_parts(path, parts, columns, append=False):
+    """
+    Make written parts visible to readers by rewriting schema.json
+
+    INPUT
+    path - store directory
+    parts - list of part info, see ColumnarWriter.info, the parts must all have the given columns
+    columns - list of the column names and dtypes of the parts
+    append - add the parts to the existing store instead of replacing its contents
+    """
+    schema = read_schema(path) if append else None
+
+    if schema is None:
+        schema = {'columns': columns, 'parts': []}
+        replaced = list_parts(path)
+    else:
+        replaced = []
+
+    schema['parts'] += parts
+
+    write_schema(path, schema)
+
+    names = [part['name'] for part in parts]
+
+    # parts that are no longer listed in the schema, readers that already mapped them keep their view
+    for part in replaced:
+        if part not in names:
+            shutil.rmtree(f'{path}/{part}', ignore_errors=True)
+
+
+def compact_parts(path):
+    """
+    Merge every run of consecutive parts with the same partition into one part, e.g. the parts incremental appends
+    add. A single part is memory mapped without copying, several are concatenated on every load
+
+    The column files of a run are concatenated as they are, nothing is decoded. The merged parts replace them in one
+    rewrite of schema.json, readers that already mapped the old parts keep their view.
+
+    INPUT
+    path - store directory
+
+    OUTPUT
+    parts - number of parts left
+    """
+    schema = read_schema(path)
+
+    runs = []
+
+    for part in schema['parts']:
+        if runs and runs[-1][-1]['partition'] == part['partition']:
+            runs[-1].append(part)
+        else:
+            runs.append([part])
+
+    parts = []
+    replaced = []
+
+    try:
+        for run in runs:
+            if len(run) == 1:
+                parts.append(run[0])
+
+                continue
+
+            merged = {'name': f'part-{uuid.uuid4().hex[:12]}', 'rows': sum(part['rows'] for part in run),
+                      'partition': run[0]['partition']}
+
+            os.makedirs(f"{path}/{merged['name']}")
+
+            parts.append(merged)
+
+            for column in schema['columns']:
+                with open(f"{path}/{merged['name']}/{column['name']}.bin", 'wb') as target:
+                    for part in run:
+                        # an empty part has no column files
+                        if part['rows']:
+                            with open(f"{path}/{part['name']}/{column['name']}.bin", 'rb') as source:
+                                shutil.copyfileobj(source, target, 1 << 20)
+
+            replaced += run
+    except BaseException:
+        for part in parts:
+            if part not in schema['parts']:
+                shutil.rmtree(f"{path}/{part['name']}", ignore_errors=True)
+
+        raise
+
+    if replaced:
+        write_schema(path, {**schema, 'parts': parts})
+
+        for part in replaced:
+            shutil.rmtree(f"{path}/{part['name']}", ignore_errors=True)
+
+    return len(parts)
+
+
+def column_schema(series):
+    """
+    Schema entry of a column, its name, stored dtype and the categories of a categorical column
+
+    INPUT
+    series - Pandas.Series
+
+    OUTPUT
+    column - dict
+    """
+    column = {'name': series.name, 'dtype': column_dtype(series).str}
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        column['categories'] = series.cat.categories.tolist()
+
+    return column
+
+
+def column_dtype(series):
+    """
+    Little endian dtype a column is stored as, the dtype of the codes for a categorical column
+
+    INPUT
+    series - Pandas.Series
+
+    OUTPUT
+    dtype - numpy.dtype
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.cat.codes
+
+    return series.to_numpy().dtype.newbyteorder('<')
+
+
+def save_columnar(dataset, path, append=False, partition=None):
+    """
+    Save a dataset, or an iterator of chunks, as a single part of a columnar store
+
+    INPUT
+    dataset - Pandas.DataFrame or an iterator of Pandas.DataFrame
+    path - store directory
+    append - add the part to the existing store instead of replacing its contents
+    partition - dict of partition keys recorded for the part, e.g. {'year': 2019}
+    """
+    writer = ColumnarWriter(path, append=append, partition=partition)
+
+    chunks = [dataset] if isinstance(dataset, pd.DataFrame) else dataset
+
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+
+        writer.commit()
+    except BaseException:
+        writer.abort()
+
+        raise
+
+
+def load_columnar(path, columns=None, partitions=None):
+    """
+    Load a columnar store as a dataframe backed by read only memory maps
+
+    A store with a single part is returned without copying, columns of multi part stores are concatenated.
+
+    INPUT
+    path - store directory
+    columns - only load these columns
+    partitions - dict of partition key -> values, only load the parts whose partition has one of the values, e.g.
+                 {'year': [2019, 2020]}. Parts that were not partitioned by a key are always loaded
+
+    OUTPUT
+    dataset - Pandas.DataFrame
+    """
+    for attempt in range(3):
+        schema = read_schema(path)
+
+        if schema is None:
+            raise FileNotFoundError(f'{path}/{SCHEMA_FILE}')
+
+        selected = [column for column in schema['columns'] if columns is None or column['name'] in columns]
+
+        parts = [part for part in schema['parts'] if part_selected(part, partitions)]
+
+        try:
+            data = {column['name']: read_column(path, parts, column) for column in selected}
+        except FileNotFoundError:
+            # the store was rewritten between reading the schema and mapping its parts, read the new schema
+            if attempt == 2:
+                raise
+
+            continue
+
+        return pd.DataFrame(data, copy=False)
+
+
+def load_columnar_parts(path, columns=None, partitions=None):
+    """
+    Load every part of a columnar store as its own dataframe backed by read only memory maps, nothing is copied, e.g.
+    to stream a store that does not fit in memory
+
+    INPUT
+    path - store directory
+    columns - only load these columns
+    partitions - only load the parts of these partitions, see load_columnar
+
+    OUTPUT
+    parts - list of (part, Pandas.DataFrame), part is the schema entry of the part (name, rows and partition)
+    """
+    schema = read_schema(path)
+
+    if schema is None:
+        raise FileNotFoundError(f'{path}/{SCHEMA_FILE}')
+
+    selected = [column for column in schema['columns'] if columns is None or column['name'] in columns]
+
+    return [
+        (part, pd.DataFrame({column['name']: read_column(path, [part], column) for column in selected}, copy=False))
+        for part in schema['parts'] if part_selected(part, partitions)
+    ]
+
+
+def part_selected(part, partitions):
+    for key, values in (partitions or {}).items():
+        if key in part['partition'] and part['partition'][key] not in values:
+            return False
+
+    return True
+
+
+def read_column(path, parts, column):
+    arrays = [
+        np.memmap(f"{path}/{part['name']}/{column['name']}.bin", dtype=column['dtype'], mode='r', shape=(part['rows'],))
+        if part['rows'] else np.empty(0, dtype=column['dtype'])
+        for part in parts
+    ]
+
+    values = arrays[0] if len(arrays) == 1 else np.concatenate(arrays) if arrays else np.empty(0, dtype=column['dtype'])
+
+    if 'categories' in column:
+        # -1 codes are missing values
+        return pd.Categorical.from_codes(values, categories=column['categories'])
+
+    return values
+
+
+def read_schema(path):
+    if not os.path.exists(f'{path}/{SCHEMA_FILE}'):
+        return None
+
+    with open(f'{path}/{SCHEMA_FILE}') as file:
+        return json.load(file)
+
+
+def write_schema(path, schema):
+    with open(f'{path}/{SCHEMA_FILE}.tmp', 'w') as file:
+        json.dump(schema, file, indent=4)
+
+    os.replace(f'{path}/{SCHEMA_FILE}.tmp', f'{path}/{SCHEMA_FILE}')
+
+
+def list_parts(path):
+    return [name for name in os.listdir(path) if name.startswith('part-') and os.path.isdir(f'{path}/{name}')]
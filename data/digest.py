@@ -0,0 +1,25 @@
+# import libraries
+import hashlib
+
+# bytes read per block, a file is hashed without holding it in memory
+BLOCK_SIZE = 1 << 20
+
+
+def file_digest(file_path, algorithm='sha256'):
+    """
+    Hash of the content of a file
+
+    INPUT
+    file_path - path of the file
+    algorithm - hashlib algorithm name, e.g. sha256 or sha1
+
+    OUTPUT
+    digest - str, hex digest
+    """
+    digest = hashlib.new(algorithm)
+
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
@@ -0,0 +1,301 @@
+# import libraries
+import argparse
+import json
+import os
+import sys
+import time
+import pandas as pd
+import numpy as np
+
+# make the data package importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data.columnar import ColumnarWriter  # noqa: E402
+
+# Rows generated per block. Every block has its own random stream derived from the seed, so the output only depends
+# on the seed, the profile and the number of rows, and the blocks are written as they are generated.
+BLOCK_ROWS = 65536
+
+# numeric columns with at most this many distinct values are generated from their value frequencies, e.g. term or
+# rate_of_interest, so that no values appear that the real data does not have
+DISCRETE_VALUES = 64
+
+# points of the per status quantile function continuous columns are sampled from
+QUANTILES = 1001
+
+
+def learn_profile(file_path):
+    """
+    Learn the raw schema and the per status marginal distributions of every column of a raw csv
+
+    INPUT
+    file_path - path of the raw csv, e.g. data.csv
+
+    OUTPUT
+    profile - dict with the source rows, the status column and its share of 1s, and one entry per column in raw order.
+        Every column has its dtype and, per status, its missing rate and either the frequencies of its values
+        (categories and discrete numbers) or its quantile function (continuous numbers). The ID column is numbered.
+    """
+    raw = pd.read_csv(file_path)
+
+    status_column = next(column for column in raw.columns if column.lower() == 'status')
+    status = raw[status_column]
+
+    columns = []
+
+    for column in raw.columns:
+        values = raw[column]
+        entry = {'name': column, 'dtype': values.dtype.str if values.dtype != object else 'object'}
+
+        if column.lower() == 'id':
+            entry.update(kind='id', start=int(values.min()))
+        elif column == status_column:
+            entry.update(kind='status')
+        else:
+            entry.update(kind=column_kind(values), integer=column_integer(values), statuses={})
+
+            for value, group in values.groupby(status):
+                entry['statuses'][str(value)] = column_distribution(group, entry['kind'], entry['integer'])
+
+        columns.append(entry)
+
+    return {
+        'source': os.path.basename(file_path),
+        'rows': int(raw.shape[0]),
+        'status': status_column,
+        'status_share': float((status == 1).mean()),
+        'columns': columns,
+    }
+
+
+def column_kind(values):
+    if values.dtype == object:
+        return 'category'
+
+    return 'discrete' if values.nunique() <= DISCRETE_VALUES else 'continuous'
+
+
+def column_integer(values):
+    if values.dtype == object:
+        return False
+
+    present = values.dropna()
+
+    return bool((present == np.round(present)).all())
+
+
+def column_distribution(values, kind, integer):
+    """
+    Missing rate and distribution of the present values of a column, within one status
+
+    INPUT
+    values - Pandas.Series, the column values of the rows with one status
+    kind - category, discrete or continuous
+    integer - whether the present values are whole numbers
+
+    OUTPUT
+    distribution - dict
+    """
+    present = values.dropna()
+
+    distribution = {'missing': float(values.isna().mean())}
+
+    if present.empty:
+        return distribution
+
+    if kind == 'continuous':
+        quantiles = np.quantile(present.to_numpy(dtype=np.float64), np.linspace(0, 1, QUANTILES))
+
+        distribution['quantiles'] = quantiles.tolist()
+    else:
+        frequencies = present.value_counts(normalize=True).sort_index()
+
+        distribution['values'] = [
+            value if kind == 'category' else int(value) if integer else float(value) for value in frequencies.index]
+        distribution['frequencies'] = frequencies.tolist()
+
+    return distribution
+
+
+def read_profile(file_path):
+    with open(file_path) as file:
+        return json.load(file)
+
+
+def write_profile(profile, file_path):
+    with open(file_path, 'w') as file:
+        json.dump(profile, file, indent=4)
+
+
+def category_vocabulary(entry):
+    """
+    Every category of a column across all statuses, in a fixed order so columnar chunks share their categories
+    """
+    return sorted({value for distribution in entry['statuses'].values() for value in distribution.get('values', [])})
+
+
+def generate_block(profile, block, rows, seed, status_share):
+    """
+    Generate one block of raw rows
+
+    INPUT
+    profile - dict, see learn_profile
+    block - index of the block, the rows are numbered from block * BLOCK_ROWS
+    rows - number of rows, at most BLOCK_ROWS
+    seed - seed of the whole dataset
+    status_share - share of rows with status 1
+
+    OUTPUT
+    dataset - Pandas.DataFrame with the raw columns in raw order, categories as Pandas.Categorical
+    """
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(block,)))
+
+    status = (rng.random(rows) < status_share).astype(np.int64)
+
+    dataset = {}
+
+    for entry in profile['columns']:
+        if entry['kind'] == 'id':
+            dataset[entry['name']] = np.arange(rows, dtype=np.int64) + entry['start'] + block * BLOCK_ROWS
+        elif entry['kind'] == 'status':
+            dataset[entry['name']] = status
+        else:
+            dataset[entry['name']] = generate_column(entry, status, rng)
+
+    return pd.DataFrame(dataset)
+
+
+def generate_column(entry, status, rng):
+    """
+    Sample a column from its per status distributions
+
+    INPUT
+    entry - dict, profile entry of the column
+    status - numpy.ndarray, status of every row
+    rng - numpy.random.Generator
+
+    OUTPUT
+    values - numpy.ndarray, or Pandas.Categorical for a category column
+    """
+    category = entry['kind'] == 'category'
+
+    if category:
+        vocabulary = category_vocabulary(entry)
+        values = np.full(status.shape[0], -1, dtype=np.int16)
+    else:
+        values = np.full(status.shape[0], np.nan, dtype=np.float64)
+
+    for value, distribution in sorted(entry['statuses'].items()):
+        rows = np.flatnonzero(status == int(value))
+
+        present = rows[rng.random(rows.shape[0]) >= distribution['missing']]
+
+        if 'quantiles' in distribution:
+            sampled = np.interp(rng.random(present.shape[0]), np.linspace(0, 1, QUANTILES), distribution['quantiles'])
+
+            values[present] = np.round(sampled) if entry['integer'] else sampled
+        elif 'values' in distribution:
+            choices = np.searchsorted(vocabulary, distribution['values']) if category else distribution['values']
+
+            values[present] = np.asarray(choices)[rng.choice(len(choices), size=present.shape[0],
+                                                             p=distribution['frequencies'])]
+
+    if category:
+        return pd.Categorical.from_codes(values, categories=vocabulary)
+
+    # integer columns without missing values keep their raw dtype, e.g. Credit_Score
+    if np.dtype(entry['dtype']).kind == 'i' and not np.isnan(values).any():
+        return values.astype(entry['dtype'])
+
+    return values
+
+
+def generate_blocks(profile, rows, seed, status_share):
+    """
+    Lazily generate rows raw rows, one block at a time
+
+    OUTPUT
+    blocks - iterator of Pandas.DataFrame
+    """
+    for block, start in enumerate(range(0, rows, BLOCK_ROWS)):
+        yield generate_block(profile, block, min(BLOCK_ROWS, rows - start), seed, status_share)
+
+
+def save_csv(blocks, file_path):
+    rows = 0
+
+    for block in blocks:
+        block.to_csv(file_path, index=False, mode='w' if rows == 0 else 'a', header=rows == 0)
+
+        rows += block.shape[0]
+
+    return rows
+
+
+def save_store(blocks, store_path):
+    writer = ColumnarWriter(store_path)
+
+    rows = 0
+
+    for block in blocks:
+        writer.write(block)
+
+        rows += block.shape[0]
+
+    writer.commit()
+
+    return rows
+
+
+def main(rows, seed, output, output_format, status_share=None, source=None, profile_path=None, save_profile=None):
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+
+    if profile_path:
+        print(f'Reading profile {profile_path}...')
+        profile = read_profile(profile_path)
+    else:
+        source = source or f'{data_dir}/data.csv'
+
+        print(f'Learning profile from {source}...')
+        profile = learn_profile(source)
+
+    if save_profile:
+        write_profile(profile, save_profile)
+
+    if status_share is None:
+        status_share = profile['status_share']
+
+    if not 0 <= status_share <= 1:
+        raise ValueError(f'status share {status_share} is not between 0 and 1')
+
+    output = output or (f'{data_dir}/synthetic_data.csv' if output_format == 'csv' else f'{data_dir}/synthetic_data')
+
+    print(f'Generating {rows} rows with seed {seed} and {status_share:.1%} status 1 into {output}...')
+
+    start = time.perf_counter()
+
+    blocks = generate_blocks(profile, rows, seed, status_share)
+
+    rows = save_csv(blocks, output) if output_format == 'csv' else save_store(blocks, output)
+
+    print(f'{rows} rows generated in {time.perf_counter() - start:.1f}s')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic raw loan data with the schema and per status distributions of data.csv')
+    parser.add_argument('--rows', type=int, default=200000, help='number of rows to generate')
+    parser.add_argument('--seed', type=int, default=0, help='the same seed always generates the same rows')
+    parser.add_argument('--output', default=None,
+                        help='csv file or columnar store to write, data/synthetic_data.csv by default')
+    parser.add_argument('--format', dest='output_format', choices=['csv', 'columnar'], default='csv',
+                        help='write a raw csv or a columnar store with categorical columns')
+    parser.add_argument('--status-share', type=float, default=None,
+                        help='share of rows with status 1, e.g. 0.5 for a balanced dataset, that of the source by '
+                             'default')
+    parser.add_argument('--source', default=None, help='raw csv the profile is learned from, data/data.csv by default')
+    parser.add_argument('--profile', dest='profile_path', default=None,
+                        help='read a profile saved with --save-profile instead of learning it')
+    parser.add_argument('--save-profile', default=None, help='write the learned profile to this json file')
+
+    main(**vars(parser.parse_args()))
@@ -0,0 +1,279 @@
+# import libraries
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the max RSS is not reported there
+    resource = None
+
+
+class StageProfiler:
+    """
+    Records the wall time, memory high water mark, rows and dtype changes of named ETL stages
+
+    Stages nest, e.g. every cleaning step runs inside clean_data, and a stage that runs more than once (per chunk or per
+    file) is aggregated under its name. seconds includes nested stages, self_seconds does not. max_rss_bytes is the high
+    water mark of the whole process when the stage ended. With trace_memory, peak_traced_bytes is the most memory
+    allocated through Python (numpy and pandas buffers included) while the stage ran. Tracing slows down allocation
+    heavy stages such as writing the csv many times over, so their times are only meaningful without it.
+    """
+
+    enabled = True
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.frames = []
+        self.start = time.perf_counter()
+        self.overhead = 0.0
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, dataset=None, column=None):
+        """
+        Profile the code in the with block as stage name
+
+        INPUT
+        name - stage name
+        dataset - Pandas.DataFrame the stage changes in place, to record its dtype changes
+        column - column of dataset the stage changes, to record the rows whose value it changed
+
+        OUTPUT
+        record - dict, the block can set record['rows'] to the rows the stage processed
+        """
+        entered = time.perf_counter()
+
+        if self.trace_memory:
+            if self.frames:
+                self.frames[-1]['peak'] = max(self.frames[-1]['peak'], tracemalloc.get_traced_memory()[1])
+
+            tracemalloc.reset_peak()
+
+        record = {}
+
+        dtypes = dataset.dtypes.copy() if dataset is not None else None
+        before = dataset[column].copy() if dataset is not None and column in dataset else None
+
+        frame = {'children': 0.0, 'peak': 0}
+        self.frames.append(frame)
+
+        start = time.perf_counter()
+
+        try:
+            yield record
+        finally:
+            seconds = time.perf_counter() - start
+
+            self.frames.pop()
+
+            if self.trace_memory:
+                frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+
+            if before is not None and column in dataset:
+                record['rows_affected'] = changed_rows(before, dataset[column])
+
+            if dtypes is not None:
+                record['dtype_changes'] = dtype_changes(dtypes, dataset.dtypes)
+
+            self.add(name, {
+                'calls': 1,
+                'seconds': seconds,
+                'self_seconds': seconds - frame['children'],
+                'peak_traced_bytes': frame['peak'] if self.trace_memory else None,
+                'max_rss_bytes': max_rss_bytes(),
+                **record,
+            })
+
+            # the bookkeeping around a stage, e.g. comparing the column before and after, is not part of its parent
+            total = time.perf_counter() - entered
+
+            self.overhead += total - seconds
+
+            if self.frames:
+                self.frames[-1]['children'] += total
+                self.frames[-1]['peak'] = max(self.frames[-1]['peak'], frame['peak'])
+
+    def iterate(self, name, chunks):
+        """
+        Profile fetching every chunk of a lazily read iterator as stage name, counting its rows
+
+        INPUT
+        name - stage name
+        chunks - Pandas.DataFrame or an iterator of Pandas.DataFrame
+
+        OUTPUT
+        chunks - iterator of Pandas.DataFrame
+        """
+        chunks = iter([chunks] if isinstance(chunks, pd.DataFrame) else chunks)
+
+        while True:
+            with self.stage(name) as record:
+                chunk = next(chunks, None)
+
+                record['rows'] = 0 if chunk is None else chunk.shape[0]
+
+            if chunk is None:
+                return
+
+            yield chunk
+
+    def add(self, name, record):
+        """
+        Aggregate a stage record, e.g. one recorded by another process (see merge)
+        """
+        if name not in self.stages:
+            self.stages[name] = {'name': name, 'calls': 0, 'seconds': 0.0, 'self_seconds': 0.0}
+
+        stage = self.stages[name]
+
+        for key in ('calls', 'seconds', 'self_seconds', 'rows', 'rows_affected'):
+            if record.get(key) is not None:
+                stage[key] = stage.get(key, 0) + record[key]
+
+        for key in ('peak_traced_bytes', 'max_rss_bytes'):
+            if record.get(key) is not None:
+                stage[key] = max(stage.get(key) or 0, record[key])
+
+        for column, change in record.get('dtype_changes', {}).items():
+            stage.setdefault('dtype_changes', {})[column] = change
+
+    def merge(self, stages):
+        """
+        Aggregate the stages of another profiler, e.g. one that ran in a worker process
+
+        INPUT
+        stages - list of stage records, see report
+        """
+        for stage in stages:
+            self.add(stage['name'], stage)
+
+    def report(self, **metadata):
+        """
+        Machine readable report of every stage, in the order they first ran
+
+        INPUT
+        metadata - extra fields for the report, e.g. the mode and input rows
+
+        OUTPUT
+        report - dict
+        """
+        return {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': sys.version.split()[0],
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            **metadata,
+            'seconds': time.perf_counter() - self.start,
+            'profiler_seconds': self.overhead,
+            'max_rss_bytes': max_rss_bytes(),
+            'stages': list(self.stages.values()),
+        }
+
+    def write_report(self, file_path, **metadata):
+        with open(file_path, 'w') as file:
+            json.dump(self.report(**metadata), file, indent=4)
+
+    def print_table(self):
+        print()
+        print(f'{time.perf_counter() - self.start:.3f}s in total, {self.overhead:.3f}s of it profiling')
+        print(f"{'stage':<28}{'calls':>6}{'seconds':>10}{'self':>10}{'peak MB':>10}{'rss MB':>10}{'rows':>10}"
+              f"{'affected':>10}  dtype changes")
+
+        for stage in self.stages.values():
+            changes = [
+                f'{column} {before}->{after}' for column, (before, after) in stage.get('dtype_changes', {}).items()]
+
+            # the json report has all of them
+            changes = ', '.join(changes[:3]) + (f' and {len(changes) - 3} more' if len(changes) > 3 else '')
+
+            print(f"{stage['name']:<28}{stage['calls']:>6}{stage['seconds']:>10.3f}{stage['self_seconds']:>10.3f}"
+                  f"{megabytes(stage.get('peak_traced_bytes')):>10}{megabytes(stage.get('max_rss_bytes')):>10}"
+                  f"{stage.get('rows', ''):>10}{stage.get('rows_affected', ''):>10}  {changes}")
+
+
+class NullProfiler:
+    """
+    Stand in for StageProfiler when the ETL is not profiled, records nothing
+    """
+
+    enabled = False
+    trace_memory = False
+
+    @contextmanager
+    def stage(self, name, dataset=None, column=None):
+        yield {}
+
+    def iterate(self, name, chunks):
+        return [chunks] if isinstance(chunks, pd.DataFrame) else chunks
+
+    def merge(self, stages):
+        pass
+
+
+def changed_rows(before, after):
+    """
+    Number of rows whose value a stage changed, missing values that stayed missing are unchanged
+
+    INPUT
+    before, after - Pandas.Series, the column before and after the stage
+
+    OUTPUT
+    rows - int
+    """
+    if before.shape[0] != after.shape[0]:
+        return after.shape[0]
+
+    before_values = before.to_numpy(dtype=object) if before.dtype.name == 'category' else before.to_numpy()
+    after_values = after.to_numpy()
+
+    unchanged = np.asarray(before_values == after_values, dtype=bool) | (before.isna().to_numpy() &
+                                                                         after.isna().to_numpy())
+
+    return int(unchanged.shape[0] - np.count_nonzero(unchanged))
+
+
+def dtype_changes(before, after):
+    """
+    Columns whose dtype changed between two DataFrame.dtypes, added and dropped columns included
+
+    INPUT
+    before, after - Pandas.Series of column -> dtype
+
+    OUTPUT
+    changes - dict of column -> [dtype before, dtype after], None for a column that did not exist
+    """
+    changes = {}
+
+    for column in list(before.index) + [column for column in after.index if column not in before.index]:
+        old = str(before[column]) if column in before.index else None
+        new = str(after[column]) if column in after.index else None
+
+        if old != new:
+            changes[column] = [old, new]
+
+    return changes
+
+
+def max_rss_bytes():
+    if resource is None:
+        return None
+
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def megabytes(value):
+    return '' if value is None else f'{value / 1e6:.1f}'
@@ -1,425 +1,1124 @@
 # import libraries
+import argparse
+import glob
+import hashlib
+import json
 import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 import pandas as pd
 import numpy as np
 
-
-def load_data():
+# make the data package importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data.columnar import ColumnarWriter, commit_parts, compact_parts, read_schema, write_schema  # noqa: E402
+from data.instrumentation import NullProfiler, StageProfiler  # noqa: E402
+from data.schema import compact  # noqa: E402
+
+# raw columns that are not used at all
+DROPPED_COLUMNS = ['id', 'year']
+
+# Cleaning plan, one step per raw column in the order they are cleaned. Keys:
+#   column - lower cased raw column
+#   rename - name of the column in processed_data.csv
+#   codes  - category label -> integer code
+#   strip  - prefix removed from integer category labels, e.g. type1 -> 1
+#   fill   - value for missing entries, None keeps them missing
+#   filled_as_float - the codes come out as floats when there were missing entries, as filling after the mapping did
+#   impute - status_median fills missing values with the median of the row's status
+#   derive - function of the dataset computing missing values from other (already cleaned) columns
+#   dtype  - dtype the column is cast to
+#   drop   - columns removed by the step
+CREDIT_BUREAU_CODES = {'EXP': 1, 'EQUI': 2, 'TRANS': 3, 'CIB': 4, 'CRIF': 4}
+
+CLEANING_PLAN = [
+    {'step': 'loan_limit', 'column': 'loan_limit', 'codes': {'cf': 1, 'ncf': 2}, 'fill': 0},
+    {'step': 'preapproval', 'column': 'approv_in_adv', 'rename': 'pre_approval', 'codes': {'nopre': 0, 'pre': 1},
+     'fill': 0},
+    {'step': 'loan_type', 'column': 'loan_type', 'strip': 'type', 'fill': 0},
+    {'step': 'loan_purpose', 'column': 'loan_purpose', 'strip': 'p', 'fill': 0},
+    {'step': 'credit_worthiness', 'drop': ['credit_worthiness']},
+    {'step': 'line_of_credit', 'column': 'open_credit', 'rename': 'line_of_credit', 'codes': {'nopc': 0, 'opc': 1},
+     'fill': 0},
+    {'step': 'commercial_loan', 'column': 'business_or_commercial', 'rename': 'commercial_loan',
+     'codes': {'nob/c': 0, 'b/c': 1}, 'fill': 0},
+    {'step': 'interest_rate', 'column': 'rate_of_interest', 'rename': 'interest_rate', 'impute': 'status_median'},
+    {'step': 'interest_rate_spread', 'column': 'interest_rate_spread', 'fill': 0.0},
+    {'step': 'upfront_charges', 'column': 'upfront_charges', 'fill': 0.0},
+    {'step': 'term', 'column': 'term', 'fill': 360, 'dtype': np.int64},
+    {'step': 'negative_amortization', 'column': 'neg_ammortization', 'rename': 'negative_amortization',
+     'codes': {'not_neg': 0, 'neg_amm': 1}, 'fill': 0},
+    {'step': 'interest_only', 'column': 'interest_only', 'codes': {'not_int': 0, 'int_only': 1}, 'fill': None},
+    {'step': 'lump_sum_payment', 'column': 'lump_sum_payment', 'codes': {'not_lpsm': 0, 'lpsm': 1}, 'fill': None},
+    {'step': 'property_value', 'column': 'property_value', 'impute': 'status_median'},
+    {'step': 'construction_type', 'column': 'construction_type', 'codes': {'sb': 1, 'mh': 2}, 'fill': 0},
+    {'step': 'occupancy_type', 'column': 'occupancy_type', 'codes': {'pr': 1, 'sr': 2, 'ir': 3}, 'fill': 0},
+    {'step': 'property_type', 'column': 'secured_by', 'rename': 'property_type', 'codes': {'home': 1, 'land': 2},
+     'fill': 0, 'filled_as_float': True},
+    {'step': 'units', 'column': 'total_units', 'rename': 'units', 'strip': 'U', 'fill': 0},
+    {'step': 'income', 'column': 'income', 'impute': 'status_median'},
+    {'step': 'credit_type', 'column': 'credit_type', 'codes': CREDIT_BUREAU_CODES, 'fill': 0, 'filled_as_float': True},
+    {'step': 'credit_score', 'column': 'credit_score', 'fill': 0},
+    {'step': 'co_borrower_credit_type', 'column': 'co-applicant_credit_type', 'rename': 'co_borrower_credit_type',
+     'codes': CREDIT_BUREAU_CODES, 'fill': 0, 'filled_as_float': True},
+    {'step': 'application_taken', 'column': 'submission_of_application', 'rename': 'application_taken',
+     'codes': {'to_inst': 1, 'not_inst': 2}, 'fill': 0},
+    {'step': 'ltv', 'column': 'ltv',
+     'derive': lambda dataset: (dataset['loan_amount'] / dataset['property_value']) * 100},
+    {'step': 'deposit_type', 'column': 'security_type', 'codes': {'direct': 1, 'Indriect': 2}, 'fill': 0},
+    {'step': 'dti', 'column': 'dtir1', 'rename': 'dti', 'impute': 'status_median'},
+    {'step': 'fair_credit', 'drop': ['gender', 'age', 'region']},
+]
+
+# raw columns whose missing values are filled with the median of their status
+IMPUTED_COLUMNS = [step['column'] for step in CLEANING_PLAN if step.get('impute') == 'status_median']
+
+# raw columns that are used as they are
+KEPT_COLUMNS = ['loan_amount', 'status']
+
+# raw columns read from data.csv, the ones that are dropped are never parsed
+RAW_COLUMNS = [step['column'] for step in CLEANING_PLAN if 'column' in step] + KEPT_COLUMNS
+
+# raw label columns, read as categoricals so every label is parsed and stored once
+RAW_CATEGORICAL_COLUMNS = [step['column'] for step in CLEANING_PLAN if 'codes' in step or 'strip' in step]
+
+# largest relative change of an imputation median the incremental mode appends with, beyond it the data is rebuilt
+DRIFT_THRESHOLD = 0.05
+
+# parts the incremental mode lets the columnar store grow to before merging them, a single part loads without a copy
+COMPACT_PARTS = 8
+
+
+def load_data(chunksize=None, usecols=None, offset=0, end=None, file_path=None):
     """
     Load the data into a dataframe
 
+    INPUT
+    chunksize - rows per chunk, when set an iterator of chunks is returned instead of one dataframe
+    usecols - only load these lower cased raw columns, RAW_COLUMNS by default
+    offset - only load the rows after this byte offset of data.csv, as recorded by the incremental mode
+    end - only load the rows before this byte offset, see raw_watermark. The whole file by default
+    file_path - raw file to load, data.csv by default
+
     OUTPUT
-    dataset - Pandas.DataFrame
+    dataset - Pandas.DataFrame or an iterator of Pandas.DataFrame
     """
-    script_root = os.path.dirname(os.path.abspath(__file__))
+    file_path = file_path or raw_file_path()
 
-    dataset = pd.read_csv(f'{script_root}/data.csv')
+    usecols = usecols or RAW_COLUMNS
 
-    return dataset
+    # data.csv mixes upper and lower case column names
+    header = pd.read_csv(file_path, nrows=0).columns
 
+    options = {
+        'chunksize': chunksize,
+        'usecols': [column for column in header if column.lower() in usecols],
+        'dtype': {column: 'category' for column in header if column.lower() in RAW_CATEGORICAL_COLUMNS},
+    }
 
-def clean_data(dataset):
-    """
-    Clean the data and write to /data/processed_data.csv
+    if not offset and end is None:
+        return pd.read_csv(file_path, **options)
 
-    INPUT
-    dataset - Pandas.DataFrame
-    """
+    if offset:
+        # the header is only at the start of the file
+        options.update(names=header, header=None)
 
-    dataset.columns = dataset.columns.str.lower()
+    if chunksize:
+        return read_range(file_path, offset, end, **options)
 
-    dataset.drop('id', inplace=True, axis=1)
-    dataset.drop('year', inplace=True, axis=1)
-
-    loan_limit(dataset)
-    preapproval(dataset)
-    loan_type(dataset)
-    loan_purpose(dataset)
-    credit_worthiness(dataset)
-    line_of_credit(dataset)
-    commercial_loan(dataset)
-    interest_rate(dataset)
-    interest_rate_spread(dataset)
-    upfront_charges(dataset)
-    term(dataset)
-    negative_amortization(dataset)
-    interest_only(dataset)
-    lump_sum_payment(dataset)
-    property_value(dataset)
-    construction_type(dataset)
-    occupancy_type(dataset)
-    property_type(dataset)
-    units(dataset)
-    income(dataset)
-    credit_type(dataset)
-    credit_score(dataset)
-    co_borrower_credit_type(dataset)
-    application_taken(dataset)
-    ltv(dataset)
-    deposit_type(dataset)
-    dti(dataset)
-    fair_credit(dataset)
-
-    return dataset.copy()
-
-
-def loan_limit(dataset):
-    """
-    Clean the loan_limit vector
+    with open(file_path, 'rb') as source:
+        return pd.read_csv(BoundedReader(source, offset, end), **options)
 
-    INPUT
-    dataset - Pandas.DataFrame
+
+def read_range(file_path, offset, end, **options):
+    """
+    Read the chunks of a csv file between two byte offsets, the file is closed once the last chunk was read
     """
-    dataset['loan_limit'].fillna(0, inplace=True)
-    dataset['loan_limit'].replace({'cf': 1, 'ncf': 2}, inplace=True)
+    with open(file_path, 'rb') as source:
+        yield from pd.read_csv(BoundedReader(source, offset, end), **options)
 
 
-def preapproval(dataset):
+class BoundedReader:
     """
-    Clean the pre_approval vector
-
-    INPUT
-    dataset - Pandas.DataFrame
+    Binary file read from a byte offset up to an end offset, bytes appended past the end are never read
     """
-    dataset.rename(columns={"approv_in_adv": "pre_approval"}, inplace=True)
-    dataset['pre_approval'].fillna(0, inplace=True)
-    dataset['pre_approval'].replace({'nopre': 0, 'pre': 1}, inplace=True)
 
+    def __init__(self, file, offset=0, end=None):
+        file.seek(offset)
+
+        self.file = file
+        self.remaining = None if end is None else end - offset
 
-def loan_type(dataset):
+    def read(self, size=-1):
+        if self.remaining is None:
+            return self.file.read(size)
+
+        data = self.file.read(self.remaining if size is None or size < 0 else min(size, self.remaining))
+
+        self.remaining -= len(data)
+
+        return data
+
+    def readline(self, size=-1):
+        if self.remaining is None:
+            return self.file.readline(size)
+
+        line = self.file.readline(self.remaining if size is None or size < 0 else min(size, self.remaining))
+
+        self.remaining -= len(line)
+
+        return line
+
+    def __iter__(self):
+        return iter(self.readline, b'')
+
+
+def profiled_load(profiler, name, chunksize=None, **kwargs):
     """
-    Clean the loan_type vector
+    load_data, profiling the read as stage name, chunk by chunk when reading in chunks
 
     INPUT
-    dataset - Pandas.DataFrame
+    profiler - data.instrumentation.StageProfiler or NullProfiler
+    name - stage name
+    chunksize - rows per chunk
+    kwargs - passed on to load_data
+
+    OUTPUT
+    dataset - Pandas.DataFrame or an iterator of Pandas.DataFrame
     """
-    dataset['loan_type'].fillna('0', inplace=True)
-    dataset['loan_type'] = dataset['loan_type'].str.replace('type', '').astype(np.int64)
+    if chunksize:
+        return profiler.iterate(name, load_data(chunksize, **kwargs))
+
+    with profiler.stage(name) as record:
+        dataset = load_data(**kwargs)
 
+        record['rows'] = dataset.shape[0]
 
-def loan_purpose(dataset):
+    return dataset
+
+
+def raw_file_path():
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    return f'{script_root}/data.csv'
+
+
+def raw_watermark():
     """
-    Clean the loan_purpose vector
+    Byte offset of data.csv just past its last complete row. A run reads up to it and records it, rows appended while
+    the run reads data.csv, or a row still being written, are left for the next incremental run
 
-    INPUT
-    dataset - Pandas.DataFrame
+    OUTPUT
+    offset - int
     """
-    dataset['loan_purpose'].fillna('p0', inplace=True)
-    dataset['loan_purpose'] = dataset['loan_purpose'].str.replace('p', '').astype(np.int64)
+    with open(raw_file_path(), 'rb') as file:
+        end = file.seek(0, os.SEEK_END)
+
+        while end > 0:
+            start = max(end - (1 << 16), 0)
+
+            file.seek(start)
+
+            newline = file.read(end - start).rfind(b'\n')
 
+            if newline >= 0:
+                return start + newline + 1
 
-def credit_worthiness(dataset):
+            end = start
+
+    return 0
+
+
+def compute_medians(chunks):
     """
-    Clean the credit_worthiness vector
+    First pass of the chunked mode, exact per status medians of the imputed columns
 
     INPUT
-    dataset - Pandas.DataFrame
+    chunks - iterator of raw Pandas.DataFrame with the status and imputed columns
+
+    OUTPUT
+    medians - dict of column -> {status: median}
     """
-    dataset.drop(columns=['credit_worthiness'], inplace=True)
+    return counts_medians(imputation_counts(chunks))
 
 
-def line_of_credit(dataset):
+def imputation_counts(chunks, value_counts=None):
     """
-    Clean the line_of_credit vector
+    Per status value counts of the imputed columns, merged across chunks
+
+    Memory grows with the number of distinct values rather than rows, and the counts of new rows can be merged into the
+    counts of the rows processed before.
 
     INPUT
-    dataset - Pandas.DataFrame
+    chunks - raw Pandas.DataFrame or an iterator of them, with the status and imputed columns
+    value_counts - counts to add the chunks to
+
+    OUTPUT
+    value_counts - dict of (column, status) -> Pandas.Series of value -> count
     """
-    dataset.rename(columns={'open_credit': 'line_of_credit'}, inplace=True)
-    dataset['line_of_credit'].fillna('0', inplace=True)
-    dataset['line_of_credit'].replace({'nopc': 0, 'opc': 1}, inplace=True)
+    value_counts = dict(value_counts or {})
+
+    chunks = [chunks] if isinstance(chunks, pd.DataFrame) else chunks
+
+    for chunk in chunks:
+        chunk.columns = chunk.columns.str.lower()
+
+        for column in IMPUTED_COLUMNS:
+            for status in (0, 1):
+                counts = chunk.loc[chunk['status'] == status, column].value_counts()
+
+                key = (column, status)
 
+                value_counts[key] = counts if key not in value_counts else value_counts[key].add(counts, fill_value=0)
 
-def commercial_loan(dataset):
+    return value_counts
+
+
+def merge_counts(value_counts, other_counts):
     """
-    Clean the commercial_loan vector
+    Add the value counts of imputation_counts of other rows, e.g. another file
 
     INPUT
-    dataset - Pandas.DataFrame
+    value_counts, other_counts - dict of (column, status) -> Pandas.Series of value -> count
+
+    OUTPUT
+    value_counts - dict of (column, status) -> Pandas.Series of value -> count
     """
-    dataset.rename(columns={'business_or_commercial': 'commercial_loan'}, inplace=True)
-    dataset['commercial_loan'].fillna(0, inplace=True)
-    dataset['commercial_loan'].replace({'nob/c': 0, 'b/c': 1}, inplace=True)
+    value_counts = dict(value_counts)
+
+    for key, counts in other_counts.items():
+        value_counts[key] = counts if key not in value_counts else value_counts[key].add(counts, fill_value=0)
+
+    return value_counts
 
 
-def interest_rate(dataset):
+def counts_medians(value_counts):
     """
-    Clean the interest_rate vector
+    Per status medians from the value counts of imputation_counts
 
     INPUT
-    dataset - Pandas.DataFrame
+    value_counts - dict of (column, status) -> Pandas.Series of value -> count
+
+    OUTPUT
+    medians - dict of column -> {status: median}
     """
-    status0_median = dataset[(dataset['status'] == 0) & (~dataset['rate_of_interest'].isna())]['rate_of_interest'].median()
-    status1_median = dataset[(dataset['status'] == 1) & (~dataset['rate_of_interest'].isna())]['rate_of_interest'].median()
+    medians = {column: {} for column in IMPUTED_COLUMNS}
 
-    dataset.loc[(dataset['status'] == 0) & (dataset['rate_of_interest'].isna()), 'rate_of_interest'] = status0_median
-    dataset.loc[(dataset['status'] == 1) & (dataset['rate_of_interest'].isna()), 'rate_of_interest'] = status1_median
+    for (column, status), counts in value_counts.items():
+        medians[column][status] = counts_median(counts)
 
-    dataset.rename(columns={'rate_of_interest': 'interest_rate'}, inplace=True)
+    return medians
 
 
-def interest_rate_spread(dataset):
+def counts_median(counts):
     """
-    Clean the interest_rate_spread vector
+    Median of the values a value_counts series was built from, the same value Series.median would give
 
     INPUT
-    dataset - Pandas.DataFrame
+    counts - Pandas.Series of value -> count
+
+    OUTPUT
+    median - float
     """
-    dataset['interest_rate_spread'].fillna(0.0, inplace=True)
+    counts = counts.sort_index()
 
+    total = int(counts.sum())
 
-def upfront_charges(dataset):
+    if total == 0:
+        return np.nan
+
+    positions = np.cumsum(counts.to_numpy())
+    values = counts.index.to_numpy(dtype=np.float64)
+
+    lower = values[np.searchsorted(positions, (total - 1) // 2, side='right')]
+    upper = values[np.searchsorted(positions, total // 2, side='right')]
+
+    return np.mean([lower, upper])
+
+
+def imputation_medians(dataset):
     """
-    Clean the interest_rate_spread vector
+    Per status medians of every column the plan imputes, from a single groupby
 
     INPUT
-    dataset - Pandas.DataFrame
+    dataset - Pandas.DataFrame with lower cased raw columns
+
+    OUTPUT
+    medians - dict of column -> {status: median}
     """
-    dataset['upfront_charges'].fillna(0.0, inplace=True)
+    medians = dataset.groupby('status')[IMPUTED_COLUMNS].median()
 
+    return {column: medians[column].to_dict() for column in IMPUTED_COLUMNS}
 
-def term(dataset):
+
+def clean_data(dataset, medians=None, profiler=None):
     """
-    Clean the term vector
+    Clean the data by running CLEANING_PLAN over it, the result has the compact dtypes of data/schema.py
 
     INPUT
     dataset - Pandas.DataFrame
+    medians - precomputed imputation medians (see compute_medians), computed from the dataset when not given
+    profiler - data.instrumentation.StageProfiler recording every step
+
+    OUTPUT
+    dataset - Pandas.DataFrame
     """
-    dataset['term'] = dataset['term'].fillna(360).astype(np.int64)
+    profiler = profiler or NullProfiler()
+
+    dataset.columns = dataset.columns.str.lower()
+
+    # load_data only reads RAW_COLUMNS, the dropped columns are only there for other readers of data.csv
+    dataset.drop(columns=DROPPED_COLUMNS, inplace=True, errors='ignore')
+
+    if medians is None:
+        with profiler.stage('imputation_medians'):
+            medians = imputation_medians(dataset)
+
+    renames = {}
+    drops = []
+
+    for step in CLEANING_PLAN:
+        with profiler.stage(step['step'], dataset, step.get('column')):
+            clean_step(dataset, step, medians)
+
+        if 'rename' in step:
+            renames[step['column']] = step['rename']
 
+        drops += step.get('drop', [])
 
-def negative_amortization(dataset):
+    with profiler.stage('rename_and_drop', dataset):
+        dataset.drop(columns=drops, inplace=True, errors='ignore')
+        dataset.rename(columns=renames, inplace=True)
+
+    with profiler.stage('compact', dataset):
+        dataset = compact(dataset)
+
+    return dataset
+
+
+def clean_chunks(chunks, medians, profiler):
     """
-    Clean the negative_amortization vector
+    Lazily clean every chunk of an iterator
 
     INPUT
-    dataset - Pandas.DataFrame
+    chunks - iterator of raw Pandas.DataFrame
+    medians - dict of column -> {status: median}
+    profiler - data.instrumentation.StageProfiler or NullProfiler
+
+    OUTPUT
+    chunks - iterator of cleaned Pandas.DataFrame
     """
-    dataset['neg_ammortization'].fillna(0, inplace=True)
-    dataset['neg_ammortization'].replace({'not_neg': 0, 'neg_amm': 1}, inplace=True)
-    dataset.rename(columns={'neg_ammortization': 'negative_amortization'}, inplace=True)
+    for chunk in chunks:
+        with profiler.stage('clean_data'):
+            chunk = clean_data(chunk, medians, profiler)
+
+        yield chunk
 
 
-def interest_only(dataset):
+def clean_step(dataset, step, medians):
     """
-    Clean the interest_only vector
+    Apply a single CLEANING_PLAN step to its column, in place
 
     INPUT
     dataset - Pandas.DataFrame
+    step - dict, entry of CLEANING_PLAN
+    medians - dict of column -> {status: median}
     """
-    dataset['interest_only'].fillna(0)
-    dataset['interest_only'].replace({'not_int': 0, 'int_only': 1}, inplace=True)
+    if 'column' not in step:
+        return
 
+    column = step['column']
 
-def lump_sum_payment(dataset):
+    if 'codes' in step or 'strip' in step:
+        values = category_codes(dataset[column], step)
+    elif step.get('impute') == 'status_median':
+        values = dataset[column].to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(values), dataset['status'].map(medians[column]).to_numpy(dtype=np.float64), values)
+    elif step.get('derive') is not None:
+        values = dataset[column].to_numpy(dtype=np.float64)
+        values = np.where(np.isnan(values), step['derive'](dataset), values)
+    else:
+        values = dataset[column]
+
+        if step.get('fill') is not None:
+            values = values.fillna(step['fill'])
+
+    if 'dtype' in step:
+        values = values.astype(step['dtype'])
+
+    dataset[column] = values
+
+
+def category_codes(series, step):
     """
-    Clean the lump_sum_payment vector
+    Map a categorical column to integer codes, each distinct category is mapped once rather than every row
 
     INPUT
-    dataset - Pandas.DataFrame
+    series - Pandas.Series of category labels
+    step - dict, entry of CLEANING_PLAN with either codes (label -> code) or strip (prefix of integer labels)
+
+    OUTPUT
+    values - numpy.ndarray, int64 or float64 when missing values are kept (or filled_as_float)
     """
-    dataset['lump_sum_payment'].fillna(0)
-    dataset['lump_sum_payment'].replace({'not_lpsm': 0, 'lpsm': 1}, inplace=True)
+    codes, categories = pd.factorize(series)
+
+    if 'codes' in step:
+        unknown = [category for category in categories if category not in step['codes']]
 
+        if unknown:
+            raise ValueError(f"unknown {step['column']} values {unknown}")
 
-def property_value(dataset):
+        lookup = [step['codes'][category] for category in categories]
+    else:
+        lookup = [int(str(category).replace(step['strip'], '')) for category in categories]
+
+    if step['fill'] is not None:
+        missing_dtype = np.float64 if step.get('filled_as_float') and (codes == -1).any() else np.int64
+
+        lookup = np.array(lookup + [step['fill']], dtype=missing_dtype)
+    elif (codes == -1).any():
+        lookup = np.array(lookup + [np.nan], dtype=np.float64)
+    else:
+        lookup = np.array(lookup + [0], dtype=np.int64)
+
+    # factorize marks missing values with -1, the last entry of the lookup
+    return lookup[codes]
+
+
+def save_data(dataset, data_dir=None):
     """
-    Clean the property_value vector
+    Save the dataset to processed_data.csv and to the typed columnar store in processed_data/
 
     INPUT
-    dataset - Pandas.DataFrame
+    dataset - Pandas.DataFrame or an iterator of Pandas.DataFrame chunks, appended in order
+    data_dir - directory to save to instead of data/, e.g. for benchmarks
     """
-    status0_median = dataset[(dataset['status'] == 0) & (~dataset['property_value'].isna())]['property_value'].median()
-    status1_median = dataset[(dataset['status'] == 1) & (~dataset['property_value'].isna())]['property_value'].median()
+    script_root = data_dir or os.path.dirname(os.path.abspath(__file__))
+
+    file_path = f'{script_root}/processed_data.csv'
+
+    # write next to the targets and swap them in so readers (the web app) never see a partial file
+    tmp_file_path = f'{file_path}.tmp'
 
-    dataset.loc[(dataset['status'] == 0) & (dataset['property_value'].isna()), 'property_value'] = status0_median
-    dataset.loc[(dataset['status'] == 1) & (dataset['property_value'].isna()), 'property_value'] = status1_median
+    columnar_writer = ColumnarWriter(f'{script_root}/processed_data')
 
+    chunks = [dataset] if isinstance(dataset, pd.DataFrame) else dataset
 
-def construction_type(dataset):
+    try:
+        for index, chunk in enumerate(chunks):
+            chunk.to_csv(tmp_file_path, index=False, mode='w+' if index == 0 else 'a', header=index == 0)
+
+            columnar_writer.write(chunk)
+    except BaseException:
+        columnar_writer.abort()
+
+        raise
+
+    os.replace(tmp_file_path, file_path)
+
+    columnar_writer.commit()
+
+
+def append_data(dataset):
     """
-    Clean the property_value vector
+    Append newly cleaned rows to processed_data.csv and add them to the columnar store as a new part. Once the store
+    has more than COMPACT_PARTS parts they are merged into one
+
+    Nothing is appended when the rows do not have the dtypes of the store, e.g. a store written before a schema change,
+    a ValueError is raised instead.
 
     INPUT
-    dataset - Pandas.DataFrame
+    dataset - Pandas.DataFrame or an iterator of Pandas.DataFrame chunks, appended in order
     """
-    dataset['construction_type'].fillna(0, inplace=True)
-    dataset['construction_type'].replace({'sb': 1, 'mh': 2}, inplace=True)
+    script_root = os.path.dirname(os.path.abspath(__file__))
 
+    file_path = f'{script_root}/processed_data.csv'
 
-def occupancy_type(dataset):
-    """
-    Clean the occupancy_type vector
+    size = os.path.getsize(file_path)
 
-    INPUT
-    dataset - Pandas.DataFrame
+    columnar_writer = ColumnarWriter(f'{script_root}/processed_data', append=True)
+
+    chunks = [dataset] if isinstance(dataset, pd.DataFrame) else dataset
+
+    try:
+        for chunk in chunks:
+            columnar_writer.write(chunk)
+
+            chunk.to_csv(file_path, index=False, mode='a', header=False)
+
+        columnar_writer.commit()
+    except BaseException:
+        columnar_writer.abort()
+
+        # drop the rows that already made it into the csv
+        with open(file_path, 'r+') as file:
+            file.truncate(size)
+
+        raise
+
+    if len(read_schema(f'{script_root}/processed_data')['parts']) > COMPACT_PARTS:
+        compact_parts(f'{script_root}/processed_data')
+
+
+class RowCounter:
+    """
+    Iterate over a dataframe or an iterator of chunks, counting the rows that went through
     """
-    dataset['occupancy_type'].fillna(0, inplace=True)
-    dataset['occupancy_type'].replace({'pr': 1, 'sr': 2, 'ir': 3}, inplace=True)
 
+    def __init__(self, dataset):
+        self.chunks = [dataset] if isinstance(dataset, pd.DataFrame) else dataset
+        self.rows = 0
 
-def property_type(dataset):
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.rows += chunk.shape[0]
+
+            yield chunk
+
+
+def state_file_path():
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    return f'{script_root}/processed_state.json'
+
+
+def read_state():
     """
-    Clean the property_type vector
+    Read the state the last run left for the incremental mode
 
-    INPUT
-    dataset - Pandas.DataFrame
+    OUTPUT
+    state - dict with the raw rows processed, the byte offset they end at and a fingerprint of the bytes before it,
+            the imputation value counts, the medians the processed rows were cleaned with and the processed files they
+            are in (see processed_files). None without a state
     """
-    dataset.rename(columns={'secured_by': 'property_type'}, inplace=True)
-    dataset['property_type'].replace({'home': 1, 'land': 2}, inplace=True)
-    dataset['property_type'].fillna(0, inplace=True)
+    if not os.path.exists(state_file_path()):
+        return None
+
+    with open(state_file_path()) as file:
+        state = json.load(file)
+
+    state['value_counts'] = {
+        (column, int(status)): pd.Series(counts['counts'], index=counts['values'], dtype=np.float64)
+        for column, statuses in state['value_counts'].items() for status, counts in statuses.items()
+    }
+    state['medians'] = {
+        column: {int(status): median for status, median in medians.items()}
+        for column, medians in state['medians'].items()
+    }
 
+    return state
 
-def units(dataset):
+
+def write_state(rows, offset, value_counts, medians):
     """
-    Clean the units vector
+    Save the state of a run for the next incremental run
 
     INPUT
-    dataset - Pandas.DataFrame
+    rows - raw rows processed so far
+    offset - byte offset of data.csv the processed rows end at
+    value_counts - imputation value counts of the processed rows, see imputation_counts
+    medians - medians the processed rows were cleaned with
     """
-    dataset.rename(columns={'total_units': 'units'}, inplace=True)
-    dataset['units'].fillna('0', inplace=True)
-    dataset['units'] = dataset['units'].str.replace('U', '').astype(np.int64)
+    serialized_counts = {column: {} for column in IMPUTED_COLUMNS}
 
+    for (column, status), counts in value_counts.items():
+        serialized_counts[column][status] = {
+            'values': counts.index.to_numpy(dtype=np.float64).tolist(),
+            'counts': counts.to_numpy(dtype=np.float64).tolist(),
+        }
 
-def income(dataset):
+    state = {
+        'rows': rows,
+        'offset': offset,
+        'fingerprint': raw_fingerprint(offset),
+        'value_counts': serialized_counts,
+        'medians': medians,
+        'processed': processed_files(),
+    }
+
+    with open(f'{state_file_path()}.tmp', 'w') as file:
+        json.dump(state, file)
+
+    os.replace(f'{state_file_path()}.tmp', state_file_path())
+
+
+def processed_files():
     """
-    Clean the income vector
+    The size of processed_data.csv and the parts of the columnar store, recorded with the state of a run
 
-    INPUT
-    dataset - Pandas.DataFrame
+    OUTPUT
+    processed - dict with csv_bytes and the part names in store order
     """
-    status0_median = dataset[(dataset['status'] == 0) & (~dataset['income'].isna())]['income'].median()
-    status1_median = dataset[(dataset['status'] == 1) & (~dataset['income'].isna())]['income'].median()
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    schema = read_schema(f'{script_root}/processed_data')
 
-    dataset.loc[(dataset['status'] == 0) & (dataset['income'].isna()), 'income'] = status0_median
-    dataset.loc[(dataset['status'] == 1) & (dataset['income'].isna()), 'income'] = status1_median
+    return {
+        'csv_bytes': os.path.getsize(f'{script_root}/processed_data.csv'),
+        'parts': [part['name'] for part in schema['parts']] if schema else [],
+    }
 
 
-def credit_type(dataset):
+def discard_unrecorded(state):
     """
-    Clean the credit_type vector
+    Drop the rows appended to the processed data after the state was written, e.g. by a run that was killed between
+    appending and writing its state, so they are not appended a second time
 
     INPUT
-    dataset - Pandas.DataFrame
+    state - state of the last run, see read_state
+
+    OUTPUT
+    consistent - False when the processed data cannot be brought back to the state and has to be rebuilt
     """
-    dataset['credit_type'].replace({'EXP': 1, 'EQUI': 2, 'TRANS': 3, 'CIB': 4, 'CRIF': 4}, inplace=True)
-    dataset['credit_type'].fillna(0, inplace=True)
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    file_path = f'{script_root}/processed_data.csv'
+    store_path = f'{script_root}/processed_data'
+
+    recorded = state.get('processed')
+    schema = read_schema(store_path)
+
+    if recorded is None or schema is None:
+        return False
+
+    parts = schema['parts'][:len(recorded['parts'])]
 
+    if [part['name'] for part in parts] != recorded['parts'] or os.path.getsize(file_path) < recorded['csv_bytes']:
+        return False
 
-def credit_score(dataset):
+    if len(schema['parts']) > len(parts):
+        print(f"Discarding {sum(part['rows'] for part in schema['parts'][len(parts):])} rows the last run did not "
+              f"record...")
+
+        write_schema(store_path, {**schema, 'parts': parts})
+
+        for part in schema['parts'][len(parts):]:
+            shutil.rmtree(f"{store_path}/{part['name']}", ignore_errors=True)
+
+    if os.path.getsize(file_path) > recorded['csv_bytes']:
+        with open(file_path, 'r+') as file:
+            file.truncate(recorded['csv_bytes'])
+
+    return True
+
+
+def raw_fingerprint(offset):
     """
-    Clean the credit_score vector
+    Hash of the data.csv bytes just before an offset, detects a data.csv that was replaced rather than appended to
 
     INPUT
-    dataset - Pandas.DataFrame
+    offset - byte offset of data.csv
+
+    OUTPUT
+    fingerprint - str
     """
-    dataset['credit_score'].fillna(0, inplace=True)
+    with open(raw_file_path(), 'rb') as file:
+        file.seek(max(offset - 4096, 0))
 
+        return hashlib.sha1(file.read(offset - file.tell())).hexdigest()
 
-def co_borrower_credit_type(dataset):
+
+def median_drift(medians, new_medians):
     """
-    Clean the co_borrower_credit_type vector
+    Largest relative change between two sets of imputation medians
 
     INPUT
-    dataset - Pandas.DataFrame
+    medians, new_medians - dict of column -> {status: median}
+
+    OUTPUT
+    drift - float
     """
-    dataset['co-applicant_credit_type'].replace({'EXP': 1, 'EQUI': 2, 'TRANS': 3, 'CIB': 4, 'CRIF': 4}, inplace=True)
-    dataset['co-applicant_credit_type'].fillna(0, inplace=True)
-    dataset.rename(columns={'co-applicant_credit_type': 'co_borrower_credit_type'}, inplace=True)
+    drift = 0.0
+
+    for column in IMPUTED_COLUMNS:
+        for status in (0, 1):
+            median = medians[column].get(status, np.nan)
+            new_median = new_medians[column].get(status, np.nan)
+
+            if np.isnan(median) and np.isnan(new_median):
+                continue
+
+            if np.isnan(median) or np.isnan(new_median):
+                return np.inf
+
+            drift = max(drift, abs(new_median - median) / max(abs(median), np.finfo(np.float64).eps))
+
+    return drift
 
 
-def application_taken(dataset):
+def process_incremental(state, chunksize=None, drift_threshold=DRIFT_THRESHOLD, profiler=None):
     """
-    Clean the application_taken vector
+    Clean and append the raw rows added to data.csv since the last run
 
     INPUT
-    dataset - Pandas.DataFrame
+    state - state of the last run, see read_state, None without one
+    chunksize - rows per chunk
+    drift_threshold - largest relative change of an imputation median the new rows are appended with
+    profiler - data.instrumentation.StageProfiler
+
+    OUTPUT
+    processed - False when the data has to be rebuilt instead
     """
-    dataset['submission_of_application'].replace({'to_inst': 1, 'not_inst': 2}, inplace=True)
-    dataset['submission_of_application'].fillna(0, inplace=True)
-    dataset.rename(columns={'submission_of_application': 'application_taken'}, inplace=True)
-    dataset['application_taken'] = dataset['application_taken'].astype(np.int64)
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    if state is None:
+        print('No state from a previous run, rebuilding...')
+
+        return False
+
+    if not os.path.exists(f'{script_root}/processed_data.csv') or not os.path.exists(f'{script_root}/processed_data'):
+        print('No processed data to append to, rebuilding...')
+
+        return False
+
+    size = os.path.getsize(raw_file_path())
+
+    if size < state['offset'] or raw_fingerprint(state['offset']) != state['fingerprint']:
+        print('data.csv was replaced, rebuilding...')
+
+        return False
+
+    if not discard_unrecorded(state):
+        print('The processed data does not match the state of the last run, rebuilding...')
+
+        return False
+
+    end = raw_watermark()
+
+    if end <= state['offset']:
+        print('No new rows to process')
+
+        return True
+
+    profiler = profiler or NullProfiler()
+
+    print('Computing imputation medians...')
+    new_rows = RowCounter(profiled_load(
+        profiler, 'load_imputed_columns', chunksize, usecols=['status', *IMPUTED_COLUMNS], offset=state['offset'],
+        end=end))
+
+    with profiler.stage('imputation_counts'):
+        value_counts = imputation_counts(new_rows, state['value_counts'])
+
+    drift = median_drift(state['medians'], counts_medians(value_counts))
+
+    if drift > drift_threshold:
+        print(f'Imputation medians drifted by {drift:.1%}, rebuilding...')
+
+        return False
+
+    print(f'Cleaning and appending {new_rows.rows} new rows...')
+    chunks = RowCounter(profiled_load(profiler, 'load_data', chunksize, offset=state['offset'], end=end))
+
+    try:
+        with profiler.stage('append_data'):
+            append_data(clean_chunks(chunks, state['medians'], profiler))
+    except ValueError as error:
+        print(f'{error}, rebuilding...')
+
+        return False
+
+    write_state(state['rows'] + chunks.rows, end, value_counts, state['medians'])
+
+    print(f'Data processed! {state["rows"] + chunks.rows} rows in total')
 
+    return True
 
-def ltv(dataset):
+
+def raw_files(input_path):
     """
-    Clean the ltv vector
+    Raw files to process, every csv in a directory or the files matching a glob, in name order
 
     INPUT
-    dataset - Pandas.DataFrame
+    input_path - directory, file or glob, e.g. data/extracts/loans-*.csv
+
+    OUTPUT
+    files - list of paths
     """
-    dataset.loc[dataset['ltv'].isna(), 'ltv'] = ((dataset['loan_amount'] / dataset['property_value']) * 100)
+    if os.path.isdir(input_path):
+        input_path = os.path.join(input_path, '*.csv')
+
+    files = sorted(glob.glob(input_path))
 
+    if not files:
+        raise FileNotFoundError(f'no raw files match {input_path}')
 
-def deposit_type(dataset):
+    return files
+
+
+def file_imputation_counts(file_path, chunksize=None):
     """
-    Clean the deposit_type vector
+    Imputation value counts of a single raw file, run in a worker process
 
     INPUT
-    dataset - Pandas.DataFrame
+    file_path - raw file
+    chunksize - rows per chunk
+
+    OUTPUT
+    value_counts - dict of (column, status) -> Pandas.Series of value -> count
     """
-    dataset['security_type'].fillna(0, inplace=True)
-    dataset['security_type'].replace({'direct': 1, 'Indriect': 2}, inplace=True)
-    dataset['security_type'] = dataset['security_type'].astype(np.int64)
+    return imputation_counts(load_data(chunksize, usecols=['status', *IMPUTED_COLUMNS], file_path=file_path))
 
 
-def dti(dataset):
+def clean_file(file_path, medians, chunksize, store_path, csv_path, profile=False, trace_memory=False):
     """
-    Clean the dti vector
+    Clean a single raw file with the global imputation medians, run in a worker process
+
+    The cleaned rows go to csv_path, without a header, and to one part of the columnar store per year. The parts are
+    written but not committed, see process_files. A file without a year column is written to a single part that is
+    not partitioned by year, so filtering by year keeps it. Rows of a file with a year column that have no year are
+    partitioned as year None, which a filter by year drops.
 
     INPUT
-    dataset - Pandas.DataFrame
+    file_path - raw file
+    medians - dict of column -> {status: median}
+    chunksize - rows per chunk
+    store_path - columnar store directory
+    csv_path - file the cleaned rows are written to
+    profile - profile the stages, in this process
+    trace_memory - trace the allocations of every stage when profiling
+
+    OUTPUT
+    parts - list of dicts with the part info and columns of every part written
+    stages - list of the profiled stages, see StageProfiler.report, empty when not profiling
     """
-    status0_median = dataset[(dataset['status'] == 0) & (~dataset['dtir1'].isna())]['dtir1'].median()
-    status1_median = dataset[(dataset['status'] == 1) & (~dataset['dtir1'].isna())]['dtir1'].median()
+    profiler = StageProfiler(trace_memory) if profile else NullProfiler()
+
+    writers = {}
+
+    chunks = profiled_load(profiler, 'load_data', chunksize, usecols=[*RAW_COLUMNS, 'year'], file_path=file_path)
+    chunks = [chunks] if isinstance(chunks, pd.DataFrame) else chunks
+
+    try:
+        for index, chunk in enumerate(chunks):
+            chunk.columns = chunk.columns.str.lower()
+
+            partitioned = 'year' in chunk
 
-    dataset.loc[(dataset['status'] == 0) & (dataset['dtir1'].isna()), 'dtir1'] = status0_median
-    dataset.loc[(dataset['status'] == 1) & (dataset['dtir1'].isna()), 'dtir1'] = status1_median
+            years = chunk.pop('year') if partitioned else pd.Series(np.nan, index=chunk.index)
 
-    dataset.rename(columns={'dtir1': 'dti'}, inplace=True)
+            with profiler.stage('clean_data'):
+                chunk = clean_data(chunk, medians, profiler)
 
+            with profiler.stage('write_parts'):
+                chunk.to_csv(csv_path, index=False, mode='w' if index == 0 else 'a', header=False)
 
-def fair_credit(dataset):
+                for year, rows in chunk.groupby(years.to_numpy(), dropna=False, sort=True):
+                    year = None if pd.isna(year) else int(year)
+
+                    if year not in writers:
+                        writers[year] = ColumnarWriter(store_path, partition={'year': year} if partitioned else None)
+
+                    writers[year].write(rows)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+
+        raise
+
+    parts = [{'part': writer.info(), 'columns': writer.columns} for writer in writers.values()]
+
+    return parts, profiler.report()['stages'] if profile else []
+
+
+def process_files(input_path, chunksize=None, workers=None, profiler=None):
     """
-    Clean columns that would violate fair credit regulations
+    Clean a directory or glob of raw files in parallel into processed_data.csv and a columnar store partitioned by year
+
+    A first parallel pass merges the imputation value counts of every file, so all files are cleaned with the same
+    global medians. processed_data.csv has the rows in file order.
 
     INPUT
-    dataset - Pandas.DataFrame
+    input_path - directory, file or glob of raw files
+    chunksize - rows per chunk within a file
+    workers - worker processes, the number of CPUs by default
+    profiler - data.instrumentation.StageProfiler, the stages of the workers are merged into it
     """
-    dataset.drop(['gender', 'age'], axis=1, inplace=True)
-    dataset.drop(['region'], axis=1, inplace=True)
+    profiler = profiler or NullProfiler()
+
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    file_path = f'{script_root}/processed_data.csv'
+    store_path = f'{script_root}/processed_data'
+
+    files = raw_files(input_path)
+
+    csv_paths = [f'{file_path}.tmp-{index}' for index in range(len(files))]
+
+    written = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        print(f'Computing imputation medians of {len(files)} files...')
+        value_counts = {}
+
+        with profiler.stage('imputation_counts'):
+            for counts in pool.map(file_imputation_counts, files, repeat(chunksize)):
+                value_counts = merge_counts(value_counts, counts)
 
+        medians = counts_medians(value_counts)
 
-def save_data(dataset):
+        print(f'Cleaning {len(files)} files...')
+        futures = [
+            pool.submit(clean_file, raw_file, medians, chunksize, store_path, csv_path, profiler.enabled,
+                        profiler.trace_memory)
+            for raw_file, csv_path in zip(files, csv_paths)
+        ]
+
+        try:
+            with profiler.stage('clean_files'):
+                for future in futures:
+                    parts, stages = future.result()
+
+                    written += parts
+
+                    # stages of the worker processes, they add up to more than the wall time of clean_files
+                    profiler.merge(stages)
+
+            columns = [part['columns'] for part in written]
+
+            if not columns:
+                raise ValueError(f'the raw files matching {input_path} have no rows')
+
+            if any(part_columns != columns[0] for part_columns in columns):
+                raise ValueError('the raw files were cleaned into different columns or dtypes')
+
+            print('Saving data...')
+            with profiler.stage('save_data'), open(f'{file_path}.tmp', 'w') as file:
+                file.write(pd.DataFrame(columns=[column['name'] for column in columns[0]]).to_csv(index=False))
+
+                # files without rows never wrote their csv
+                for csv_path in filter(os.path.exists, csv_paths):
+                    with open(csv_path) as csv_file:
+                        shutil.copyfileobj(csv_file, file)
+
+            os.replace(f'{file_path}.tmp', file_path)
+
+            commit_parts(store_path, [part['part'] for part in written], columns[0])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+
+            for part in written:
+                shutil.rmtree(f"{store_path}/{part['part']['name']}", ignore_errors=True)
+
+            raise
+        finally:
+            for csv_path in csv_paths:
+                if os.path.exists(csv_path):
+                    os.remove(csv_path)
+
+    # the incremental mode follows data.csv, the next incremental run rebuilds from it
+    if os.path.exists(state_file_path()):
+        os.remove(state_file_path())
+
+    years = sorted({part['part']['partition']['year'] for part in written if 'year' in part['part']['partition']},
+                   key=lambda year: (year is None, year))
+
+    unpartitioned = sum(part['part']['rows'] for part in written if 'year' not in part['part']['partition'])
+
+    print(f"Data processed! {sum(part['part']['rows'] for part in written)} rows in year partitions {years}"
+          + (f", {unpartitioned} of them from files without a year" if unpartitioned else ''))
+
+
+def main(chunksize=None, incremental=False, drift_threshold=DRIFT_THRESHOLD, input_path=None, workers=None,
+         profile=None, profile_table=False, trace_memory=False):
+    profiler = StageProfiler(trace_memory) if profile or profile_table else NullProfiler()
+
+    if input_path:
+        if incremental:
+            raise ValueError('the incremental mode only follows data.csv, it cannot be combined with --input')
+
+        process_files(input_path, chunksize, workers, profiler)
+
+        mode = 'files'
+    elif incremental and process_incremental(read_state(), chunksize, drift_threshold, profiler):
+        mode = 'incremental'
+    else:
+        rebuild(chunksize, profiler)
+
+        mode = 'chunked' if chunksize else 'full'
+
+    if profile:
+        profiler.write_report(profile, mode=mode, input=input_path or raw_file_path(), chunksize=chunksize)
+
+    if profile_table:
+        profiler.print_table()
+
+
+def rebuild(chunksize=None, profiler=None):
     """
-    Save the dataset
+    Clean all of data.csv into processed_data.csv and the columnar store
 
     INPUT
-    dataset - Pandas.DataFrame
+    chunksize - rows per chunk, the whole file is loaded at once when not set
+    profiler - data.instrumentation.StageProfiler
     """
-    script_root = os.path.dirname(os.path.abspath(__file__))
+    profiler = profiler or NullProfiler()
 
-    file_path = f'{script_root}/processed_data.csv'
+    # rows appended to data.csv while it is read are picked up by the next incremental run
+    offset = raw_watermark()
+
+    if chunksize:
+        print('Computing imputation medians...')
+        with profiler.stage('imputation_counts'):
+            value_counts = imputation_counts(
+                profiled_load(profiler, 'load_imputed_columns', chunksize, usecols=['status', *IMPUTED_COLUMNS],
+                              end=offset))
+
+        medians = counts_medians(value_counts)
+
+        print('Cleaning and saving data in chunks...')
+        chunks = RowCounter(profiled_load(profiler, 'load_data', chunksize, end=offset))
 
-    if os.path.exists(file_path):
-        os.remove(file_path)
+        with profiler.stage('save_data'):
+            save_data(clean_chunks(chunks, medians, profiler))
 
-    dataset.to_csv(file_path, index=False, mode='w+')
+        write_state(chunks.rows, offset, value_counts, medians)
 
+        print('Data processed!')
+
+        return
 
-def main():
     print('Loading data...')
-    dataset = load_data()
+    dataset = profiled_load(profiler, 'load_data', end=offset)
+
+    with profiler.stage('imputation_counts'):
+        value_counts = imputation_counts(dataset)
+
+    medians = counts_medians(value_counts)
 
     print('Cleaning data...')
-    dataset = clean_data(dataset)
+    with profiler.stage('clean_data'):
+        dataset = clean_data(dataset, medians, profiler)
 
     print('Saving data...')
-    save_data(dataset)
+    with profiler.stage('save_data'):
+        save_data(dataset)
+
+    write_state(dataset.shape[0], offset, value_counts, medians)
 
     print('Data processed!')
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Clean data.csv into processed_data.csv')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='process data.csv this many rows at a time to bound memory')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only clean and append the rows added to data.csv since the last run')
+    parser.add_argument('--drift-threshold', type=float, default=DRIFT_THRESHOLD,
+                        help='rebuild instead of appending when an imputation median changes by more than this')
+    parser.add_argument('--input', dest='input_path', default=None,
+                        help='directory or glob of raw csv files to clean in parallel instead of data.csv, the '
+                             'columnar store is partitioned by year')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes for --input')
+    parser.add_argument('--profile', default=None, metavar='REPORT',
+                        help='write the time, memory, rows and dtype changes of every stage to this json file')
+    parser.add_argument('--profile-table', action='store_true', help='print the stage profile as a table')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record the peak allocations of every stage, this slows down the stages it measures')
+
+    main(**vars(parser.parse_args()))
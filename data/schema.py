@@ -0,0 +1,86 @@
+# import libraries
+import numpy as np
+import pandas as pd
+
+# Compact dtype of every processed_data column. Flags and category codes fit in int8, term and credit_score in int16.
+# Rates, LTV and DTI only carry a few significant digits so float32 is enough, dollar amounts stay float64 so that
+# values such as $3,586,500.00 are kept exactly. interest_only and lump_sum_payment keep their missing values (see
+# CLEANING_PLAN), so they are float32 too, whether or not a particular chunk or file has any.
+PROCESSED_SCHEMA = {
+    'loan_limit': np.int8,
+    'pre_approval': np.int8,
+    'loan_type': np.int8,
+    'loan_purpose': np.int8,
+    'line_of_credit': np.int8,
+    'commercial_loan': np.int8,
+    'loan_amount': np.float64,
+    'interest_rate': np.float32,
+    'interest_rate_spread': np.float32,
+    'upfront_charges': np.float64,
+    'term': np.int16,
+    'negative_amortization': np.int8,
+    'interest_only': np.float32,
+    'lump_sum_payment': np.float32,
+    'property_value': np.float64,
+    'construction_type': np.int8,
+    'occupancy_type': np.int8,
+    'property_type': np.int8,
+    'units': np.int8,
+    'income': np.float64,
+    'credit_type': np.int8,
+    'credit_score': np.int16,
+    'co_borrower_credit_type': np.int8,
+    'application_taken': np.int8,
+    'ltv': np.float32,
+    'security_type': np.int8,
+    'status': np.int8,
+    'dti': np.float32,
+}
+
+
+def column_schema_dtype(series):
+    """
+    Compact dtype a processed column is stored as
+
+    INPUT
+    series - Pandas.Series, a processed_data column
+
+    OUTPUT
+    dtype - numpy.dtype, the dtype of the series itself for columns that are not in the schema
+    """
+    return np.dtype(PROCESSED_SCHEMA.get(series.name, series.dtype))
+
+
+def compact(dataset):
+    """
+    Cast a processed dataset to the compact schema, in place
+
+    INPUT
+    dataset - Pandas.DataFrame
+
+    OUTPUT
+    dataset - Pandas.DataFrame
+    """
+    for column in dataset.columns:
+        dtype = column_schema_dtype(dataset[column])
+
+        if dataset[column].dtype != dtype:
+            dataset[column] = dataset[column].astype(dtype)
+
+    return dataset
+
+
+def read_processed_csv(file_path, columns=None):
+    """
+    Read processed_data.csv straight into the compact schema
+
+    INPUT
+    file_path - path of processed_data.csv
+    columns - only read these columns
+
+    OUTPUT
+    dataset - Pandas.DataFrame
+    """
+    dtypes = {column: dtype for column, dtype in PROCESSED_SCHEMA.items() if columns is None or column in columns}
+
+    return pd.read_csv(file_path, dtype=dtypes, usecols=columns)
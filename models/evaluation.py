@@ -0,0 +1,212 @@
+# import libraries
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from joblib import Parallel, delayed
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from sklearn.metrics import classification_report, confusion_matrix, r2_score, ConfusionMatrixDisplay
+
+from data.process_data import CLEANING_PLAN
+
+# processed columns the metrics are broken down by
+SEGMENT_COLUMNS = ['loan_type', 'loan_purpose', 'occupancy_type', 'credit_type']
+
+EVALUATION_DIR = f'{os.path.dirname(os.path.abspath(__file__))}/evaluation'
+
+
+def evaluate(y_test, y_pred, classes, segments=None):
+    """
+    Classification report, confusion matrix and per segment metrics of predictions
+
+    INPUT
+    y_test - numpy.ndarray of the true statuses
+    y_pred - numpy.ndarray of the predicted statuses
+    classes - numpy.ndarray of the class labels
+    segments - Pandas.DataFrame with the SEGMENT_COLUMNS of the same rows
+
+    OUTPUT
+    report - dict
+    """
+    y_test = np.asarray(y_test)
+    y_pred = np.asarray(y_pred)
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'rows': int(y_test.shape[0]),
+        'accuracy': float(np.mean(y_test == y_pred)),
+        'r2': float(r2_score(y_test, y_pred)),
+        'classification_report': classification_report(y_test, y_pred, labels=classes, output_dict=True,
+                                                        zero_division=0),
+        'confusion_matrix': {
+            'labels': [int(label) for label in classes],
+            'matrix': confusion_matrix(y_test, y_pred, labels=classes).tolist(),
+        },
+        'segments': segment_metrics(y_test, y_pred, segments) if segments is not None else {},
+    }
+
+
+def segment_metrics(y_test, y_pred, segments):
+    """
+    Metrics of every value of every segment column, from one groupby over the predictions stacked per column
+
+    INPUT
+    y_test, y_pred - numpy.ndarray
+    segments - Pandas.DataFrame of segment columns
+
+    OUTPUT
+    metrics - dict of column -> list of dicts with the value, its label, rows, accuracy, and the precision, recall and
+        f1 of status 1
+    """
+    outcomes = pd.DataFrame({
+        'true_positive': (y_test == 1) & (y_pred == 1),
+        'false_positive': (y_test != 1) & (y_pred == 1),
+        'false_negative': (y_test == 1) & (y_pred != 1),
+        'correct': y_test == y_pred,
+    })
+
+    stacked = pd.concat(
+        [outcomes.assign(column=column, value=segments[column].to_numpy().astype(np.int64)) for column in segments],
+        ignore_index=True)
+
+    counts = stacked.groupby(['column', 'value'], sort=True).agg(
+        rows=('correct', 'size'),
+        correct=('correct', 'sum'),
+        true_positive=('true_positive', 'sum'),
+        false_positive=('false_positive', 'sum'),
+        false_negative=('false_negative', 'sum'),
+    )
+
+    metrics = {column: [] for column in segments}
+
+    for (column, value), count in counts.iterrows():
+        precision = ratio(count['true_positive'], count['true_positive'] + count['false_positive'])
+        recall = ratio(count['true_positive'], count['true_positive'] + count['false_negative'])
+
+        metrics[column].append({
+            'value': int(value),
+            'label': segment_label(column, value),
+            'rows': int(count['rows']),
+            'accuracy': ratio(count['correct'], count['rows']),
+            'precision': precision,
+            'recall': recall,
+            'f1': ratio(2 * precision * recall, precision + recall),
+        })
+
+    return metrics
+
+
+def ratio(numerator, denominator):
+    return float(numerator / denominator) if denominator else 0.0
+
+
+def segment_label(column, value):
+    """
+    Raw label of a processed category code, from the cleaning plan, e.g. credit_type 1 -> EXP
+    """
+    step = next(step for step in CLEANING_PLAN if step.get('rename', step.get('column')) == column)
+
+    if value == step.get('fill'):
+        return 'missing'
+
+    if 'strip' in step:
+        return f"{step['strip']}{value}"
+
+    return '/'.join(label for label, code in step.get('codes', {}).items() if code == value) or str(value)
+
+
+def render_confusion_matrix(matrix, labels, file_path):
+    figure = Figure(figsize=(5, 4))
+    FigureCanvasAgg(figure)
+
+    ConfusionMatrixDisplay(confusion_matrix=np.array(matrix), display_labels=labels).plot(ax=figure.subplots())
+
+    figure.savefig(file_path)
+
+    return file_path
+
+
+def render_segment(column, metrics, file_path):
+    figure = Figure(figsize=(7, 4))
+    FigureCanvasAgg(figure)
+
+    ax = figure.subplots()
+
+    positions = np.arange(len(metrics))
+    width = 0.25
+
+    for offset, metric in enumerate(['accuracy', 'precision', 'recall']):
+        ax.bar(positions + (offset - 1) * width, [entry[metric] for entry in metrics], width, label=metric)
+
+    ax.set_xticks(positions)
+    ax.set_xticklabels([f"{entry['label']}\n{entry['rows']} rows" for entry in metrics])
+    ax.set_ylim(0, 1)
+    ax.set_title(column)
+    ax.legend()
+
+    figure.tight_layout()
+    figure.savefig(file_path)
+
+    return file_path
+
+
+def write_bundle(report, output_dir=EVALUATION_DIR, jobs=None):
+    """
+    Write the report as evaluation.json and its figures as PNG files to output_dir, replacing the previous bundle
+
+    The figures are rendered in parallel worker processes with the Agg backend, nothing is shown.
+
+    INPUT
+    report - dict, see evaluate
+    output_dir - bundle directory
+    jobs - number of processes rendering figures, one per figure up to the number of cores by default
+    """
+    tmp_dir = f'{output_dir}.tmp-{uuid.uuid4().hex[:8]}'
+
+    os.makedirs(tmp_dir)
+
+    figures = [
+        (render_confusion_matrix, report['confusion_matrix']['matrix'], report['confusion_matrix']['labels'],
+         'confusion_matrix.png'),
+        *[(render_segment, column, metrics, f'segment_{column}.png') for column, metrics in report['segments'].items()],
+    ]
+
+    jobs = jobs or min(len(figures), os.cpu_count() or 1)
+
+    Parallel(n_jobs=jobs)(delayed(render)(*arguments, f'{tmp_dir}/{name}') for render, *arguments, name in figures)
+
+    with open(f'{tmp_dir}/evaluation.json', 'w') as file:
+        json.dump({**report, 'figures': [name for *_, name in figures]}, file, indent=4)
+
+    # a directory cannot be replaced atomically, move the old one out of the way first
+    if os.path.exists(output_dir):
+        old_dir = f'{output_dir}.old-{uuid.uuid4().hex[:8]}'
+
+        os.replace(output_dir, old_dir)
+        os.replace(tmp_dir, output_dir)
+
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(tmp_dir, output_dir)
+
+
+def print_report(report):
+    print(f"accuracy {report['accuracy']:.4f}, R-squared {report['r2']:.4f} on {report['rows']} rows")
+
+    for label, metrics in report['classification_report'].items():
+        if isinstance(metrics, dict):
+            print(f"{label:>14} precision {metrics['precision']:.3f} recall {metrics['recall']:.3f} "
+                  f"f1 {metrics['f1-score']:.3f} support {metrics['support']}")
+
+    for column, metrics in report['segments'].items():
+        print(column)
+
+        for entry in metrics:
+            print(f"{entry['label']:>14} {entry['rows']:>8} rows, accuracy {entry['accuracy']:.3f}, precision "
+                  f"{entry['precision']:.3f}, recall {entry['recall']:.3f}")
@@ -0,0 +1,219 @@
+# import libraries
+import math
+import time
+import warnings
+
+import numpy as np
+
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.model_selection import ParameterGrid, check_cv
+
+
+class BudgetedHalvingSearchCV(ClassifierMixin, BaseEstimator):
+    """
+    Successive halving over training epochs, with an optional wall clock budget, for warm startable classifiers such as
+    MLPClassifier
+
+    Every candidate of the grid is trained for min_iter epochs on each fold and scored on the held out fold, then only
+    the best 1/factor of the candidates continue, warm started for factor times as many epochs in total. Once at most
+    factor candidates are left they are trained until they converge (early stopping) or reach max_iter epochs, and the
+    best of them is refit on all the data. When budget seconds have passed no more training steps are started, the
+    best candidate of the last rung that had any complete candidates wins. The refit is not part of the budget.
+
+    random_state is set on every candidate, so a warm started candidate keeps its early stopping validation split.
+
+    It exposes the same best_params_, best_score_, best_estimator_, classes_ and predict as GridSearchCV.
+    """
+
+    def __init__(self, estimator, param_grid, cv=3, factor=3, min_iter=20, max_iter=None, budget=None, n_jobs=None,
+                 random_state=None, verbose=0):
+        self.estimator = estimator
+        self.param_grid = param_grid
+        self.cv = cv
+        self.factor = factor
+        self.min_iter = min_iter
+        self.max_iter = max_iter
+        self.budget = budget
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.verbose = verbose
+
+    def fit(self, X, y):
+        """
+        Search the grid and refit the best candidate on X, y
+
+        INPUT
+        X - numpy.ndarray of features
+        y - numpy.ndarray of labels
+
+        OUTPUT
+        self
+        """
+        start = time.time()
+        deadline = start + self.budget if self.budget else None
+
+        X = np.asarray(X)
+        y = np.asarray(y)
+
+        max_iter = self.max_iter or self.estimator.get_params()['max_iter']
+
+        folds = list(check_cv(self.cv, y, classifier=True).split(X, y))
+
+        candidates = list(ParameterGrid(self.param_grid))
+
+        estimators = [
+            [clone(self.estimator).set_params(**params, warm_start=True, random_state=self.random_state) for _ in folds]
+            for params in candidates]
+
+        epochs = [0] * len(candidates)
+        converged = [[False] * len(folds) for _ in candidates]
+        scores = [None] * len(candidates)
+
+        results = []
+        alive = list(range(len(candidates)))
+        rung = 0
+
+        while True:
+            final = len(alive) <= self.factor
+            target = max_iter if final else min(max_iter, self.min_iter * self.factor ** rung)
+
+            # candidates with a complete step in this rung, and those the budget stopped before they had one
+            stepped, stale = set(), set()
+
+            # the last rung trains in steps too, so the budget is checked while the finalists converge
+            while True:
+                pending = [index for index in alive if epochs[index] < target and not all(converged[index])]
+
+                if not pending or (deadline and time.time() > deadline):
+                    break
+
+                step = min(target - max(epochs[index] for index in pending), self.min_iter * self.factor ** rung)
+
+                skipped = self._train_step(X, y, folds, pending, estimators, converged, scores, epochs, step, deadline)
+
+                stale |= skipped - stepped
+                stepped |= set(pending) - skipped
+
+            completed = [index for index in alive
+                         if index not in stale and scores[index] is not None and None not in scores[index]]
+
+            for index in completed:
+                results.append({
+                    'iter': rung,
+                    'n_resources': epochs[index],
+                    'params': candidates[index],
+                    'mean_test_score': float(np.mean(scores[index])),
+                    'std_test_score': float(np.std(scores[index])),
+                })
+
+            if self.verbose:
+                best = max((np.mean(scores[index]) for index in completed), default=float('nan'))
+
+                print(f'rung {rung}: {len(alive)} candidates, {target} epochs, {len(completed)} scored, best score '
+                      f'{best:.4f}, {time.time() - start:.1f}s')
+
+            over_budget = deadline is not None and time.time() > deadline
+
+            if final or over_budget or len(completed) <= 1:
+                break
+
+            completed.sort(key=lambda index: np.mean(scores[index]), reverse=True)
+
+            alive = completed[:max(1, math.ceil(len(completed) / self.factor))]
+            rung += 1
+
+        if not results:
+            raise RuntimeError(f'the budget of {self.budget}s ran out before any candidate was scored')
+
+        last_rung = results[-1]['iter']
+
+        best = max((result for result in results if result['iter'] == last_rung),
+                   key=lambda result: result['mean_test_score'])
+
+        self.cv_results_ = {key: [result[key] for result in results] for key in results[0]}
+        self.n_candidates_ = len(candidates)
+        self.n_iterations_ = last_rung + 1
+        self.best_params_ = best['params']
+        self.best_score_ = best['mean_test_score']
+        self.search_seconds_ = time.time() - start
+
+        self.best_estimator_ = clone(self.estimator).set_params(**self.best_params_, random_state=self.random_state)
+        self.best_estimator_.fit(X, y)
+        self.classes_ = self.best_estimator_.classes_
+
+        return self
+
+    def _train_step(self, X, y, folds, pending, estimators, converged, scores, epochs, step, deadline):
+        """
+        Train every fold of the pending candidates for step more epochs, in parallel, and score them
+
+        OUTPUT
+        skipped - set of the candidates with a fold that was not trained because the budget ran out
+        """
+        tasks = [(index, fold) for index in pending for fold in range(len(folds)) if not converged[index][fold]]
+
+        fitted = Parallel(n_jobs=self.n_jobs)(
+            delayed(fit_step)(estimators[index][fold], X, y, *folds[fold], step, deadline) for index, fold in tasks)
+
+        skipped = set()
+
+        for (index, fold), (estimator, score, done) in zip(tasks, fitted):
+            if score is None:
+                # the budget ran out, the fold keeps its previous score
+                skipped.add(index)
+                continue
+
+            if scores[index] is None:
+                scores[index] = [None] * len(folds)
+
+            estimators[index][fold] = estimator
+            scores[index][fold] = score
+            converged[index][fold] = done
+
+        for index in pending:
+            if index not in skipped:
+                epochs[index] += step
+
+        return skipped
+
+    def predict(self, X):
+        return self.best_estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.best_estimator_.predict_proba(X)
+
+
+def fit_step(estimator, X, y, train, test, epochs, deadline=None):
+    """
+    Continue training a warm started estimator for some epochs and score it on the held out rows
+
+    INPUT
+    estimator - classifier with warm_start=True
+    X, y - numpy.ndarray
+    train, test - row indices of the fold
+    epochs - number of epochs to train for
+    deadline - time.time() after which the step is skipped
+
+    OUTPUT
+    estimator - the trained estimator
+    score - accuracy on the test rows, None when the step was skipped
+    converged - whether training stopped early, further steps would not change it
+    """
+    if deadline is not None and time.time() > deadline:
+        return estimator, None, False
+
+    trained = getattr(estimator, 'n_iter_', 0)
+
+    estimator.set_params(max_iter=epochs)
+
+    # stopping at max_iter is the point of a step
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', ConvergenceWarning)
+
+        estimator.fit(X[train], y[train])
+
+    converged = estimator.n_iter_ - trained < epochs
+
+    return estimator, estimator.score(X[test], y[test]), converged
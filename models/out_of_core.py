@@ -0,0 +1,199 @@
+# import libraries
+import copy
+import time
+import warnings
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.neural_network import MLPClassifier
+from sklearn.preprocessing import StandardScaler
+
+from data.columnar import load_columnar_parts
+
+# Rows copied out of the memory mapped store at a time. Only one block of features is in memory, scaled, while the
+# network trains on it in mini-batches of batch_size rows.
+BLOCK_ROWS = 65536
+
+# shard of every row, drawn per part from the seed and the part name
+TRAIN, VALIDATION, TEST = 0, 1, 2
+
+
+class OutOfCoreTrainer:
+    """
+    Trains the MLPClassifier on a columnar store larger than memory, streaming blocks of rows from its memory maps
+
+    Every row is assigned to the training, validation or test shard by a random draw seeded with the seed and the name
+    of its part, so the shards are the same in every pass and every run. A first pass over the training shard
+    computes the scaling statistics, then every epoch streams the training shard in shuffled block order into
+    MLPClassifier.partial_fit. After each epoch the validation shard is scored, training stops once its accuracy did
+    not improve by tol for n_iter_no_change epochs and the weights of the best epoch are kept, as early_stopping does
+    for MLPClassifier.fit. The blocks are passed to the network in dtype, float32 trains a float32 network.
+    """
+
+    def __init__(self, store_path, scale_columns, partitions=None, test_size=0.3, validation_size=0.1, max_iter=200,
+                 n_iter_no_change=10, tol=1e-4, batch_size=200, block_rows=BLOCK_ROWS, seed=40, dtype=np.float64,
+                 **classifier_params):
+        self.store_path = store_path
+        self.scale_columns = scale_columns
+        self.partitions = partitions
+        self.test_size = test_size
+        self.validation_size = validation_size
+        self.max_iter = max_iter
+        self.n_iter_no_change = n_iter_no_change
+        self.tol = tol
+        self.batch_size = batch_size
+        self.block_rows = block_rows
+        self.seed = seed
+        self.dtype = dtype
+        self.classifier_params = classifier_params
+
+        self.parts = load_columnar_parts(store_path, partitions=partitions)
+
+        if not self.parts:
+            raise ValueError(f'{store_path} has no parts for {partitions}')
+
+        self.feature_names = [column for column in self.parts[0][1].columns if column != 'status']
+
+    def shards(self, part, rows):
+        rng = np.random.default_rng([self.seed, zlib.crc32(part['name'].encode())])
+
+        draws = rng.random(rows)
+
+        return np.where(draws < self.test_size, TEST, np.where(draws < self.test_size + self.validation_size,
+                                                               VALIDATION, TRAIN)).astype(np.int8)
+
+    def blocks(self, shard, rng=None, scaler=None):
+        """
+        Stream the rows of one shard in blocks
+
+        INPUT
+        shard - TRAIN, VALIDATION or TEST
+        rng - numpy.random.Generator to shuffle the parts, the blocks and the rows within a block, None keeps the order
+        scaler - StandardScaler applied to the scale columns
+
+        OUTPUT
+        blocks - iterator of (X, y), X a Pandas.DataFrame of the features, y a numpy.ndarray of the statuses
+        """
+        parts = list(self.parts)
+
+        if rng is not None:
+            parts = [parts[index] for index in rng.permutation(len(parts))]
+
+        for part, dataset in parts:
+            selected = self.shards(part, dataset.shape[0]) == shard
+
+            starts = np.arange(0, dataset.shape[0], self.block_rows)
+
+            if rng is not None:
+                starts = rng.permutation(starts)
+
+            for start in starts:
+                rows = np.flatnonzero(selected[start:start + self.block_rows]) + start
+
+                if rows.shape[0] == 0:
+                    continue
+
+                if rng is not None:
+                    rows = rng.permutation(rows)
+
+                # copies just this block out of the memory maps
+                block = dataset.take(rows)
+
+                X = block[self.feature_names].reset_index(drop=True)
+
+                if scaler is not None:
+                    X[self.scale_columns] = scaler.transform(X[self.scale_columns])
+
+                yield X, block['status'].to_numpy()
+
+    def fit_scaler(self):
+        scaler = StandardScaler(with_mean=True, with_std=True)
+
+        for X, _ in self.blocks(TRAIN):
+            scaler.partial_fit(X[self.scale_columns])
+
+        return scaler
+
+    def fit(self, verbose=True):
+        """
+        Fit the scaler and train the classifier
+
+        OUTPUT
+        classifier - sklearn.neural_network.MLPClassifier with the weights of the best validation epoch
+        scaler - sklearn.preprocessing.StandardScaler of the scale columns
+        """
+        start = time.perf_counter()
+
+        self.scaler = self.fit_scaler()
+
+        classifier = MLPClassifier(batch_size=self.batch_size, random_state=self.seed, **self.classifier_params)
+
+        rng = np.random.default_rng(self.seed)
+
+        classes = np.array([0, 1])
+
+        best_score, best_classifier, no_improvement = -np.inf, None, 0
+
+        for epoch in range(self.max_iter):
+            rows = 0
+
+            with warnings.catch_warnings():
+                # partial_fit runs a single epoch over each block, it never converges on its own
+                warnings.simplefilter('ignore', ConvergenceWarning)
+
+                for X, y in self.blocks(TRAIN, rng, self.scaler):
+                    classifier.partial_fit(X.to_numpy(dtype=self.dtype), y, classes=classes)
+
+                    rows += y.shape[0]
+
+            score = self.score(classifier, VALIDATION)
+
+            if verbose:
+                print(f'epoch {epoch + 1}: {rows} rows, loss {classifier.loss_:.4f}, validation score {score:.4f}, '
+                      f'{time.perf_counter() - start:.1f}s')
+
+            if score > best_score + self.tol:
+                best_score, best_classifier, no_improvement = score, copy.deepcopy(classifier), 0
+            else:
+                no_improvement += 1
+
+                if no_improvement > self.n_iter_no_change:
+                    break
+
+        self.best_validation_score_ = best_score
+        self.n_iter_ = epoch + 1
+        self.classifier = best_classifier
+
+        return self.classifier, self.scaler
+
+    def score(self, classifier, shard):
+        correct, rows = 0, 0
+
+        for X, y in self.blocks(shard, scaler=self.scaler):
+            correct += np.count_nonzero(classifier.predict(X.to_numpy(dtype=self.dtype)) == y)
+            rows += y.shape[0]
+
+        return correct / rows if rows else 0.0
+
+    def predict_test(self, columns=None):
+        """
+        Statuses and predictions of the test shard
+
+        INPUT
+        columns - feature columns to return for the test rows as well, e.g. to break the metrics down by them
+
+        OUTPUT
+        y_test, y_pred - numpy.ndarray
+        features - Pandas.DataFrame of the columns
+        """
+        y_test, y_pred, features = [], [], []
+
+        for X, y in self.blocks(TEST, scaler=self.scaler):
+            y_test.append(y)
+            y_pred.append(self.classifier.predict(X.to_numpy(dtype=self.dtype)))
+            features.append(X[columns or []])
+
+        return np.concatenate(y_test), np.concatenate(y_pred), pd.concat(features, ignore_index=True)
@@ -0,0 +1,201 @@
+# import libraries
+import argparse
+import json
+import os
+import shutil
+import sys
+import uuid
+from datetime import datetime, timezone
+
+# make the data package importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data.digest import file_digest  # noqa: E402
+
+REGISTRY_DIR = f'{os.path.dirname(os.path.abspath(__file__))}/registry'
+
+# pointer to the version the web app serves, replaced atomically on every publish, activate and rollback
+CURRENT_FILE = 'current.json'
+
+METADATA_FILE = 'metadata.json'
+
+# versions kept in the registry besides the current and previous ones, the oldest are removed beyond that
+REGISTRY_VERSIONS = 10
+
+
+def publish(artifacts, metadata, registry_dir=REGISTRY_DIR, activate_version=True):
+    """
+    Copy model artifacts into a new version of the registry
+
+    The version is assembled in a temporary directory and renamed into place complete, a version directory is never
+    changed afterwards.
+
+    INPUT
+    artifacts - dict of file name -> path of the file to copy, e.g. {'model.npz': 'models/model.npz'}
+    metadata - dict stored with the version, e.g. the parameters and scores of the model
+    registry_dir - registry directory
+    activate_version - make the new version the current one
+
+    OUTPUT
+    version - str, e.g. v0007
+    """
+    os.makedirs(f'{registry_dir}/versions', exist_ok=True)
+
+    tmp_path = f'{registry_dir}/versions/.tmp-{uuid.uuid4().hex[:8]}'
+
+    os.makedirs(tmp_path)
+
+    files = {}
+
+    for name, file_path in artifacts.items():
+        shutil.copyfile(file_path, f'{tmp_path}/{name}')
+
+        files[name] = {'bytes': os.path.getsize(f'{tmp_path}/{name}'), 'sha256': file_digest(f'{tmp_path}/{name}')}
+
+    while True:
+        version = f'v{max(version_numbers(registry_dir), default=0) + 1:04d}'
+
+        with open(f'{tmp_path}/{METADATA_FILE}', 'w') as file:
+            json.dump({
+                'version': version,
+                'created': datetime.now(timezone.utc).isoformat(),
+                'artifacts': files,
+                **metadata,
+            }, file, indent=4)
+
+        try:
+            os.rename(tmp_path, version_path(version, registry_dir))
+            break
+        except OSError:
+            # another run published the same version number meanwhile, take the next one
+            if not os.path.exists(version_path(version, registry_dir)):
+                raise
+
+    if activate_version:
+        activate(version, registry_dir)
+
+    prune(registry_dir)
+
+    return version
+
+
+def activate(version, registry_dir=REGISTRY_DIR):
+    """
+    Point the registry at a version, the one it pointed at becomes the previous version
+
+    OUTPUT
+    pointer - dict with the version, the previous version and when it was activated
+    """
+    if not os.path.exists(f'{version_path(version, registry_dir)}/{METADATA_FILE}'):
+        raise ValueError(f'{version} is not in {registry_dir}')
+
+    current = read_current(registry_dir)
+
+    pointer = {
+        'version': version,
+        'previous': current['version'] if current and current['version'] != version else None,
+        'activated': datetime.now(timezone.utc).isoformat(),
+    }
+
+    tmp_file_path = f'{registry_dir}/{CURRENT_FILE}.tmp-{uuid.uuid4().hex[:8]}'
+
+    with open(tmp_file_path, 'w') as file:
+        json.dump(pointer, file, indent=4)
+
+    os.replace(tmp_file_path, f'{registry_dir}/{CURRENT_FILE}')
+
+    return pointer
+
+
+def rollback(registry_dir=REGISTRY_DIR):
+    """
+    Point the registry back at the previous version. Web workers still hold the previous version in memory, so they
+    switch back without loading it. Rolling back twice returns to the version rolled back from
+
+    OUTPUT
+    pointer - dict, see activate
+    """
+    current = read_current(registry_dir)
+
+    if current is None or current['previous'] is None:
+        raise ValueError(f'{registry_dir} has no previous version to roll back to')
+
+    return activate(current['previous'], registry_dir)
+
+
+def read_current(registry_dir=REGISTRY_DIR):
+    """
+    The pointer to the current version, None for an empty registry
+    """
+    try:
+        with open(f'{registry_dir}/{CURRENT_FILE}') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def read_metadata(version, registry_dir=REGISTRY_DIR):
+    with open(f'{version_path(version, registry_dir)}/{METADATA_FILE}') as file:
+        return json.load(file)
+
+
+def version_path(version, registry_dir=REGISTRY_DIR):
+    return f'{registry_dir}/versions/{version}'
+
+
+def version_numbers(registry_dir=REGISTRY_DIR):
+    if not os.path.exists(f'{registry_dir}/versions'):
+        return []
+
+    return [int(name[1:]) for name in os.listdir(f'{registry_dir}/versions') if name[:1] == 'v' and name[1:].isdigit()]
+
+
+def versions(registry_dir=REGISTRY_DIR):
+    """
+    Metadata of every version, oldest first
+    """
+    return [read_metadata(f'v{number:04d}', registry_dir) for number in sorted(version_numbers(registry_dir))]
+
+
+def prune(registry_dir=REGISTRY_DIR, keep=REGISTRY_VERSIONS):
+    """
+    Remove all but the newest versions, never the current or the previous one
+    """
+    current = read_current(registry_dir) or {}
+
+    protected = {current.get('version'), current.get('previous')}
+
+    for number in sorted(version_numbers(registry_dir))[:-keep]:
+        if f'v{number:04d}' not in protected:
+            shutil.rmtree(version_path(f'v{number:04d}', registry_dir), ignore_errors=True)
+
+
+def main(command, version=None, registry_dir=REGISTRY_DIR):
+    if command == 'list':
+        current = read_current(registry_dir) or {}
+
+        markers = {current.get('version'): 'current', current.get('previous'): 'previous'}
+
+        for metadata in versions(registry_dir):
+            print(f"{metadata['version']:>8} {metadata['created']} test accuracy "
+                  f"{metadata.get('test_accuracy', float('nan')):.4f} {markers.get(metadata['version'], '')}")
+
+        return
+
+    pointer = rollback(registry_dir) if command == 'rollback' else activate(version, registry_dir)
+
+    print(f"{registry_dir} now serves {pointer['version']}, previously {pointer['previous']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='List the model versions, or change the one the web app serves')
+    parser.add_argument('command', choices=['list', 'rollback', 'activate'])
+    parser.add_argument('version', nargs='?', default=None, help='version to activate, e.g. v0003')
+    parser.add_argument('--registry', dest='registry_dir', default=REGISTRY_DIR, help='registry directory')
+
+    args = parser.parse_args()
+
+    if args.command == 'activate' and args.version is None:
+        parser.error('activate needs a version')
+
+    main(**vars(args))
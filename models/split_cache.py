@@ -0,0 +1,134 @@
+# import libraries
+import hashlib
+import json
+import os
+import shutil
+import uuid
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from data.digest import file_digest
+
+# entries kept in the cache, the least recently used ones are removed beyond that
+CACHE_ENTRIES = 4
+
+
+def split_key(fingerprint, **parameters):
+    """
+    Cache key of a train/test split, a hash of the dataset and of everything the split depends on
+
+    INPUT
+    fingerprint - identifies the dataset content, see store_fingerprint and file_fingerprint
+    parameters - e.g. the seed, test size, scaled columns and dtype of the split
+
+    OUTPUT
+    key - str
+    """
+    return hashlib.sha256(json.dumps({'dataset': fingerprint, **parameters}, sort_keys=True).encode()).hexdigest()
+
+
+def store_fingerprint(schema, parts):
+    """
+    Fingerprint of the selected parts of a columnar store. Parts are never changed once committed and every write
+    creates new ones, so their names, rows and the column dtypes identify the content without reading it
+
+    INPUT
+    schema - dict, schema of the store (see data.columnar.read_schema)
+    parts - list of the selected part entries
+
+    OUTPUT
+    fingerprint - dict
+    """
+    return {'columns': schema['columns'], 'parts': parts}
+
+
+def file_fingerprint(file_path):
+    """
+    Fingerprint of a file, the sha256 of its content
+    """
+    return file_digest(file_path)
+
+
+def read_split(cache_dir, key):
+    """
+    Memory map a cached split
+
+    INPUT
+    cache_dir - cache directory
+    key - see split_key
+
+    OUTPUT
+    split - (X_train, X_test, y_train, y_test, scaler) with the features as Pandas.DataFrame and the statuses as
+        Pandas.Series over read only memory maps, or None when the split is not cached
+    """
+    entry_path = f'{cache_dir}/{key}'
+
+    if not os.path.exists(f'{entry_path}/split.json'):
+        return None
+
+    with open(f'{entry_path}/split.json') as file:
+        metadata = json.load(file)
+
+    # a hit keeps the entry from being pruned
+    os.utime(f'{entry_path}/split.json')
+
+    arrays = {
+        name: np.load(f'{entry_path}/{name}.npy', mmap_mode='r') for name in ['X_train', 'X_test', 'y_train', 'y_test']}
+
+    return (
+        pd.DataFrame(arrays['X_train'], columns=metadata['feature_names'], copy=False),
+        pd.DataFrame(arrays['X_test'], columns=metadata['feature_names'], copy=False),
+        pd.Series(arrays['y_train'], name=metadata['target'], copy=False),
+        pd.Series(arrays['y_test'], name=metadata['target'], copy=False),
+        joblib.load(f'{entry_path}/scaler.joblib'),
+    )
+
+
+def write_split(cache_dir, key, X_train, X_test, y_train, y_test, scaler, dtype=np.float64):
+    """
+    Write a split to the cache as .npy files, the features as one dtype matrix each
+
+    INPUT
+    cache_dir - cache directory
+    key - see split_key
+    X_train, X_test - Pandas.DataFrame
+    y_train, y_test - Pandas.Series
+    scaler - sklearn.preprocessing.StandardScaler fit on the training data
+    dtype - dtype of the feature matrices
+    """
+    tmp_entry_path = f'{cache_dir}/{key}.tmp-{uuid.uuid4().hex[:8]}'
+
+    os.makedirs(tmp_entry_path)
+
+    np.save(f'{tmp_entry_path}/X_train.npy', X_train.to_numpy(dtype=dtype))
+    np.save(f'{tmp_entry_path}/X_test.npy', X_test.to_numpy(dtype=dtype))
+    np.save(f'{tmp_entry_path}/y_train.npy', y_train.to_numpy())
+    np.save(f'{tmp_entry_path}/y_test.npy', y_test.to_numpy())
+
+    joblib.dump(scaler, f'{tmp_entry_path}/scaler.joblib')
+
+    with open(f'{tmp_entry_path}/split.json', 'w') as file:
+        json.dump({'feature_names': list(X_train.columns), 'target': y_train.name, 'dtype': np.dtype(dtype).name},
+                  file, indent=4)
+
+    # another run may have cached the same split meanwhile, both are identical
+    if os.path.exists(f'{cache_dir}/{key}'):
+        shutil.rmtree(tmp_entry_path)
+    else:
+        os.replace(tmp_entry_path, f'{cache_dir}/{key}')
+
+    prune(cache_dir)
+
+
+def prune(cache_dir, entries=CACHE_ENTRIES):
+    """
+    Remove all but the most recently used entries
+    """
+    keys = [key for key in os.listdir(cache_dir) if os.path.exists(f'{cache_dir}/{key}/split.json')]
+
+    keys.sort(key=lambda key: os.path.getmtime(f'{cache_dir}/{key}/split.json'), reverse=True)
+
+    for key in keys[entries:]:
+        shutil.rmtree(f'{cache_dir}/{key}', ignore_errors=True)
@@ -1,31 +1,124 @@
 # import libraries
+import argparse
+import copy
+import json
 import pickle
 import os
+import shutil
+import sys
+import tempfile
 
-import pandas as pd
-import matplotlib.pyplot as plt
+import joblib
+import numpy as np
 
-from sklearn.metrics import classification_report, r2_score, confusion_matrix, ConfusionMatrixDisplay
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.neural_network import MLPClassifier
 from sklearn.preprocessing import StandardScaler
-
-
-def load_data():
+from threadpoolctl import threadpool_limits
+
+# make the data package importable when this file is run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from data.columnar import load_columnar, part_selected, read_schema  # noqa: E402
+from data.schema import read_processed_csv  # noqa: E402
+from models import registry  # noqa: E402
+from models.evaluation import SEGMENT_COLUMNS, evaluate, print_report, write_bundle  # noqa: E402
+from models.halving_search import BudgetedHalvingSearchCV  # noqa: E402
+from models.out_of_core import OutOfCoreTrainer  # noqa: E402
+from models.split_cache import file_fingerprint, read_split, split_key, store_fingerprint, write_split  # noqa: E402
+from web.providers.MLPPredictor import MLPPredictor  # noqa: E402
+
+# columns standardized before training, the others are flags and category codes
+SCALE_COLUMNS = [
+    'loan_amount',
+    'ltv',
+    'upfront_charges',
+    'property_value',
+    'income',
+    'interest_rate',
+    'term',
+    'credit_score',
+    'dti'
+]
+
+# train/test split, the same for every run on the same data
+SPLIT_SEED = 40
+TEST_SIZE = 0.3
+
+# split and scaled train/test matrices of recently used datasets, memory mapped by later runs
+SPLIT_CACHE_DIR = f'{os.path.dirname(os.path.abspath(__file__))}/../.cache/splits'
+
+# the training matrix shared with the CV workers is written here, in memory where the OS has a tmpfs for it
+SHARED_MEMORY_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def load_data(years=None, data_dir=None, cache=True, dtype=np.float64):
     """
     Load the data into the script
 
+    The scaled train/test split is cached as .npy files keyed by a hash of the dataset and the split parameters, later
+    runs on the same data memory map it instead of splitting and scaling again.
+
+    INPUT
+    years - only train on these years of a store partitioned by process_data.py --input
+    data_dir - directory with processed_data.csv and processed_data/, data/ by default
+    cache - read and write the split cache
+    dtype - dtype of the features, float32 for train_classifier.py --float32
+
     OUTPUT
     dataset - Pandas.DataFrame
+    X_train, X_test, y_train, y_test - Pandas.DataFrame, dtype features over read only memory maps when cached
+    scaler - sklearn.preprocessing.StandardScaler fit on the training data
     """
-    script_root = os.path.dirname(os.path.abspath(__file__))
+    data_dir = data_dir or f'{os.path.dirname(os.path.abspath(__file__))}/../data'
+
+    partitions = {'year': years} if years else None
+
+    # the typed columnar store is memory mapped, the csv is only parsed when process_data.py did not write one
+    if os.path.exists(f'{data_dir}/processed_data/schema.json'):
+        schema = read_schema(f'{data_dir}/processed_data')
+        fingerprint = store_fingerprint(schema, [part for part in schema['parts'] if part_selected(part, partitions)])
+
+        dataset = load_columnar(f'{data_dir}/processed_data', partitions=partitions)
+    else:
+        fingerprint = file_fingerprint(f'{data_dir}/processed_data.csv') if cache else None
+
+        dataset = read_processed_csv(f'{data_dir}/processed_data.csv')
+
+    if not cache:
+        X_train, X_test, y_train, y_test, scaler = split_data(dataset)
+
+        return dataset, X_train.astype(dtype), X_test.astype(dtype), y_train, y_test, scaler
+
+    key = split_key(fingerprint, seed=SPLIT_SEED, test_size=TEST_SIZE, scale_columns=SCALE_COLUMNS,
+                    dtype=np.dtype(dtype).name)
+
+    split = read_split(SPLIT_CACHE_DIR, key)
+
+    if split is None:
+        write_split(SPLIT_CACHE_DIR, key, *split_data(dataset), dtype=dtype)
+
+        split = read_split(SPLIT_CACHE_DIR, key)
+
+    return (dataset, *split)
+
 
-    dataset = pd.read_csv(f'{script_root}/../data/processed_data.csv')
+def split_data(dataset):
+    """
+    Split the dataset into scaled train and test sets
 
+    INPUT
+    dataset - Pandas.DataFrame
+
+    OUTPUT
+    X_train, X_test, y_train, y_test - Pandas.DataFrame
+    scaler - sklearn.preprocessing.StandardScaler fit on the training data
+    """
     y = dataset["status"].copy()
     X = dataset.drop(["status", ], axis=1, inplace=False).copy()
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=40)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=TEST_SIZE, random_state=SPLIT_SEED)
 
     # Rest indices from dropped columns
     X_train.reset_index(inplace=True, drop=True)
@@ -33,17 +126,7 @@ def load_data():
     y_train.reset_index(inplace=True, drop=True)
     y_test.reset_index(inplace=True, drop=True)
 
-    scale_columns = [
-        'loan_amount',
-        'ltv',
-        'upfront_charges',
-        'property_value',
-        'income',
-        'interest_rate',
-        'term',
-        'credit_score',
-        'dti'
-    ]
+    scale_columns = SCALE_COLUMNS
 
     scaler = StandardScaler(with_mean=True, with_std=True)
 
@@ -52,7 +135,7 @@ def load_data():
     X_train[scale_columns] = scaler.transform(X_train[scale_columns].copy())
     X_test[scale_columns] = scaler.transform(X_test[scale_columns].copy())
 
-    return dataset, X_train, X_test, y_train, y_test
+    return X_train, X_test, y_train, y_test, scaler
 
 
 def build_model(X_train, X_test, y_train, y_test):
@@ -84,22 +167,55 @@ def build_model(X_train, X_test, y_train, y_test):
     return classifier
 
 
-def improve_model(classifier, X_train, y_train, X_test, y_test):
+def improve_model(classifier, X_train, y_train, X_test, y_test, search='halving', budget=None, jobs=None, threads=1):
     """
-    Improve the classifier with GridSearchCV
+    Improve the classifier with a successive halving search or an exhaustive GridSearchCV
+
+    The CV workers memory map the training matrix from one shared file instead of each receiving a pickled copy, and
+    every worker limits its BLAS to threads threads so jobs x threads does not oversubscribe the cores.
+
+    INPUT
+    search - halving prunes poor candidates after a few epochs (see BudgetedHalvingSearchCV), grid trains every
+        candidate to convergence
+    budget - seconds after which the halving search stops training candidates
+    jobs - number of CV worker processes, the number of cores divided by threads by default
+    threads - BLAS threads per worker
 
     OUTPUT
-    pipeline sklearn.Pipeline
+    cv - fitted BudgetedHalvingSearchCV or GridSearchCV
     """
+    jobs, threads = parallel_split(jobs, threads)
+
     parameters = {
         'hidden_layer_sizes': [(20, 20), (25, 25)],
         'learning_rate_init': [.001, .003, .004],
         'tol': [1e-05, 5e-05, 1e-04],
     }
 
-    cv = GridSearchCV(classifier, param_grid=parameters, cv=3, verbose=5, n_jobs=-1, return_train_score=True)
+    if search == 'halving':
+        cv = BudgetedHalvingSearchCV(classifier, param_grid=parameters, cv=3, factor=3, min_iter=20, budget=budget,
+                                     n_jobs=jobs, random_state=40, verbose=1)
+    else:
+        cv = GridSearchCV(classifier, param_grid=parameters, cv=3, verbose=5, n_jobs=jobs, return_train_score=True)
+
+    print(f'{jobs} workers with {threads} BLAS threads each')
+
+    folder = tempfile.mkdtemp(prefix='train_classifier-', dir=SHARED_MEMORY_DIR)
+
+    X = y = None
+
+    try:
+        X = shared_memmap(X_train.to_numpy(), folder, 'X_train')
+        y = shared_memmap(y_train.to_numpy(), folder, 'y_train')
+
+        # inner_max_num_threads limits the BLAS of the loky workers, threadpool_limits that of this process
+        with joblib.parallel_backend('loky', inner_max_num_threads=threads), threadpool_limits(limits=threads):
+            print(cv.fit(X, y))
+    finally:
+        del X, y
+
+        shutil.rmtree(folder, ignore_errors=True)
 
-    print(cv.fit(X_train.to_numpy(), y_train.to_numpy()))
     print(f"recommended estimator: {cv.best_estimator_}")
     print(f"recommended parameters: {cv.best_params_}")
     print(f"best score: {cv.best_score_}")
@@ -113,6 +229,42 @@ def improve_model(classifier, X_train, y_train, X_test, y_test):
 
 
 
+def parallel_split(jobs=None, threads=1):
+    """
+    Number of worker processes and BLAS threads per worker
+
+    INPUT
+    jobs - number of worker processes, None for as many as fit on the cores with threads threads each
+    threads - BLAS threads per worker
+
+    OUTPUT
+    jobs, threads - int
+    """
+    threads = max(1, threads or 1)
+
+    return jobs or max(1, (os.cpu_count() or 1) // threads), threads
+
+
+def shared_memmap(array, folder, name):
+    """
+    Write an array to folder and open it read only memory mapped. joblib passes a memory mapped array to worker
+    processes by file name, so all of them read the same pages
+
+    INPUT
+    array - numpy.ndarray
+    folder - directory the file is written to
+    name - file name without extension
+
+    OUTPUT
+    array - numpy.memmap
+    """
+    file_path = f'{folder}/{name}.mmap'
+
+    joblib.dump(np.ascontiguousarray(array), file_path)
+
+    return joblib.load(file_path, mmap_mode='r')
+
+
 def evaluate_model(cv, X_test, y_test):
     """
     Evaluate the model and print out a classification report
@@ -121,33 +273,175 @@ def evaluate_model(cv, X_test, y_test):
     model - sklearn.Pipeline
     X_test - sklearn.List
     Y_test - sklearn.List
+
+    OUTPUT
+    report - dict, see models.evaluation.evaluate
     """
     y_pred = cv.predict(X_test.to_numpy())
 
-    # Classification report
-    print(classification_report(y_test, y_pred))
+    return report_predictions(y_test.to_numpy(), y_pred, cv.classes_, X_test[SEGMENT_COLUMNS])
+
+
+def report_predictions(y_test, y_pred, classes, segments=None):
+    """
+    Print the evaluation of predictions and write it with its figures to models/evaluation, without showing anything
+
+    INPUT
+    y_test - numpy.ndarray of the true statuses
+    y_pred - numpy.ndarray of the predicted statuses
+    classes - numpy.ndarray of the class labels
+    segments - Pandas.DataFrame with the SEGMENT_COLUMNS of the same rows, for the per segment metrics
+
+    OUTPUT
+    report - dict, see models.evaluation.evaluate
+    """
+    report = evaluate(y_test, y_pred, classes, segments)
+
+    print_report(report)
+
+    write_bundle(report)
 
-    # R squared score
-    r2 = r2_score(y_test.to_numpy(), y_pred)
-    print(f"R-squared score: {r2}")
+    return report
 
-    # Confusion matrix
-    _confusion_matrix = confusion_matrix(y_test, y_pred, labels=cv.classes_)
-    disp = ConfusionMatrixDisplay(confusion_matrix=_confusion_matrix, display_labels=cv.classes_)
-    disp.plot()
-    plt.show()
 
+def float32_parity(classifier, model, X_test, float64_split, feature_names):
+    """
+    Compare the float32 model the web app serves with the same network trained in float64. Both are fused with their
+    scaler and scored by MLPPredictor on raw inputs, as the web app scores them: folding 1 / scale into float32 weights
+    and casting raw dollar amounts to float32 is where float32 loses the most precision
+
+    The float64 twin is trained with the same parameters, random_state included, on the float64 split of the same rows.
+
+    INPUT
+    classifier - sklearn.neural_network.MLPClassifier trained on float32 features, before fusing
+    model - the model with the scaler fused in (see fuse_scaler), as it is exported
+    X_test - float32 scaled test features, the same rows as the float64 ones
+    float64_split - X_train, X_test, y_train, y_test and the scaler in float64
+    feature_names - list of the model input columns, in order
+
+    OUTPUT
+    report - dict with the accuracy of both served models, the accuracy delta, the share of test rows both predict the
+        same status for and the largest difference in the probability of status 1, the same for the float32 weights
+        scored in float64, and for the fused float32 model against the unfused one on scaled inputs
+    """
+    X_train64, X_test64, y_train64, y_test64, scaler64 = float64_split
+
+    reference = fuse_scaler(clone(classifier).fit(X_train64.to_numpy(), y_train64.to_numpy()), scaler64, feature_names)
+
+    fused = getattr(model, 'best_estimator_', model)
+
+    # the raw test rows the web app would be sent
+    X_raw = X_test64.copy()
+    X_raw[scaler64.feature_names_in_] = scaler64.inverse_transform(X_raw[scaler64.feature_names_in_])
+    X_raw = X_raw.to_numpy()
+
+    y_test = y_test64.to_numpy()
+
+    served = predictor(fused)
+
+    probabilities = served.predict_proba(X_raw)[:, 1]
+    reference_probabilities = predictor(reference).predict_proba(X_raw)[:, 1]
+    # the float32 weights in float64, isolates the error of float32 arithmetic when scoring
+    upcast_probabilities = predictor(fused, np.float64).predict_proba(X_raw)[:, 1]
+    # the unfused float32 network on the scaled float32 inputs it was trained on, isolates the error of fusing
+    unfused_probabilities = classifier.predict_proba(X_test.to_numpy())[:, 1]
+
+    y_pred, reference_pred, upcast_pred, unfused_pred = [
+        served.classes_[(values > 0.5).astype(int)]
+        for values in [probabilities, reference_probabilities, upcast_probabilities, unfused_probabilities]]
+
+    return {
+        'rows': int(y_test.shape[0]),
+        'same_initialization': classifier.random_state is not None,
+        'float32_accuracy': float(np.mean(y_pred == y_test)),
+        'float64_accuracy': float(np.mean(reference_pred == y_test)),
+        'accuracy_delta': float(np.mean(y_pred == y_test) - np.mean(reference_pred == y_test)),
+        'prediction_agreement': float(np.mean(y_pred == reference_pred)),
+        'max_probability_difference': float(np.max(np.abs(probabilities - reference_probabilities))),
+        'scoring_prediction_agreement': float(np.mean(y_pred == upcast_pred)),
+        'scoring_max_probability_difference': float(np.max(np.abs(probabilities - upcast_probabilities))),
+        'fusion_prediction_agreement': float(np.mean(y_pred == unfused_pred)),
+        'fusion_max_probability_difference': float(np.max(np.abs(probabilities - unfused_probabilities))),
+    }
+
+
+def predictor(classifier, dtype=None):
+    """
+    The MLPPredictor the web app builds from the export of a fused classifier, optionally with its weights cast
+    """
+    dtype = dtype or classifier.coefs_[0].dtype
+
+    return MLPPredictor(
+        coefs=[coef.astype(dtype) for coef in classifier.coefs_],
+        intercepts=[intercept.astype(dtype) for intercept in classifier.intercepts_],
+        activation=classifier.activation,
+        out_activation=classifier.out_activation_,
+        classes=classifier.classes_,
+    )
+
+
+def write_parity_report(report):
     script_root = os.path.dirname(os.path.abspath(__file__))
-    plt.savefig(f'{script_root}/models/confusion_matrix.png')
 
+    with open(f'{script_root}/float32_parity.json', 'w') as file:
+        json.dump(report, file, indent=4)
+
+    print(f"float32 accuracy {report['float32_accuracy']:.4f}, float64 accuracy {report['float64_accuracy']:.4f} "
+          f"(delta {report['accuracy_delta']:+.4f}), {report['prediction_agreement']:.2%} of the predictions agree")
+    print(f"scoring the float32 weights in float64 changes {1 - report['scoring_prediction_agreement']:.2%} of the "
+          f"predictions, probabilities by at most {report['scoring_max_probability_difference']:.2e}")
+    print(f"fusing the scaler into the float32 weights changes {1 - report['fusion_prediction_agreement']:.2%} of the "
+          f"predictions, probabilities by at most {report['fusion_max_probability_difference']:.2e}")
+
+
+def fuse_scaler(model, scaler, feature_names):
+    """
+    Fold the StandardScaler into the first layer of the network so the model scores raw, unscaled inputs
+
+    ((x - mean) / scale) @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+
+    INPUT
+    model - sklearn.model_selection.GridSearchCV or BudgetedHalvingSearchCV, or an MLPClassifier trained out of core
+    scaler - sklearn.preprocessing.StandardScaler
+    feature_names - list of the model input columns, in order
+
+    OUTPUT
+    model - copy of the model whose (best) classifier takes raw inputs
+    """
+    model = copy.deepcopy(model)
+
+    classifier = getattr(model, 'best_estimator_', model)
+
+    scale_index = [list(feature_names).index(column) for column in scaler.feature_names_in_]
+
+    coef = classifier.coefs_[0].copy()
+
+    # the scaler statistics are float64, the fused weights keep the dtype the network was trained in
+    classifier.intercepts_[0] = (
+        classifier.intercepts_[0] - (scaler.mean_ / scaler.scale_) @ coef[scale_index]).astype(coef.dtype)
+
+    coef[scale_index] = (coef[scale_index] / scaler.scale_[:, None]).astype(coef.dtype)
+
+    classifier.coefs_[0] = coef
+
+    # lets the web app tell a fused model from one that still expects scaled inputs
+    classifier.scaler_fused_ = True
+
+    return model
 
-def save_model(model):
+
+def save_model(model, feature_names, metadata=None):
     """
-        Save the completed model for re-use
+        Save the completed model for re-use, export it and publish both artifacts as a new version of the model
+        registry, which the running web app swaps in
 
         INPUT
-        model - sklearn.Pipeline
-        model_filepath - string
+        model - search or classifier with the scaler fused in (see fuse_scaler)
+        feature_names - list of the model input columns, in order
+        metadata - dict stored with the version, e.g. its parameters and scores
+
+        OUTPUT
+        version - str, the published registry version
     """
     script_root = os.path.dirname(os.path.abspath(__file__))
 
@@ -158,23 +452,155 @@ def save_model(model):
 
     pickle.dump(model, open(file_path, 'wb'))
 
+    export_model(model, feature_names)
+
+    return registry.publish(
+        {'model.sav': file_path, 'model.npz': f'{script_root}/model.npz'},
+        {'feature_names': list(feature_names), **(metadata or {})},
+    )
+
+
+def export_model(model, feature_names):
+    """
+        Export the fitted network as plain arrays to model.npz so the web app can score without sklearn
+
+        INPUT
+        model - search or classifier with the scaler fused in (see fuse_scaler)
+        feature_names - list of the model input columns, in order
+    """
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    file_path = f'{script_root}/model.npz'
+
+    classifier = getattr(model, 'best_estimator_', model)
+
+    feature_names = list(feature_names)
+
+    arrays = {
+        'feature_names': np.array(feature_names),
+        'classes': classifier.classes_,
+        'activation': np.array(classifier.activation),
+        'out_activation': np.array(classifier.out_activation_),
+    }
+
+    for layer, (coef, intercept) in enumerate(zip(classifier.coefs_, classifier.intercepts_)):
+        arrays[f'coef_{layer}'] = coef
+        arrays[f'intercept_{layer}'] = intercept
+
+    with open(f'{file_path}.tmp', 'wb') as file:
+        np.savez(file, **arrays)
+
+    os.replace(f'{file_path}.tmp', file_path)
+
+
+def main(years=None, search='halving', budget=None, jobs=None, threads=1, out_of_core=False, split_cache=True,
+         float32=False):
+    dtype = np.float32 if float32 else np.float64
+
+    if out_of_core:
+        return main_out_of_core(years, dtype)
 
-def main():
     print('Loading cleaned data...')
-    dataset, X_train, X_test, y_train, y_test = load_data()
+    dataset, X_train, X_test, y_train, y_test, scaler = load_data(years, cache=split_cache, dtype=dtype)
 
     print('Building the model...')
     classifier = build_model(X_train, X_test, y_train, y_test)
 
-    print('Grid search...')
-    cv = improve_model(classifier, X_train, y_train, X_test, y_test)
+    print('Hyperparameter search...')
+    cv = improve_model(classifier, X_train, y_train, X_test, y_test, search, budget, jobs, threads)
 
     print('Evaluate the model...')
-    evaluate_model(cv, X_test, y_test)
+    report = evaluate_model(cv, X_test, y_test)
+
+    print('Fuse the scaler into the model...')
+    model = fuse_scaler(cv, scaler, X_train.columns)
+
+    if float32:
+        print('Compare the served model with float64...')
+        write_parity_report(float32_parity(cv.best_estimator_, model, X_test, load_data(years, cache=split_cache)[1:6],
+                                           X_train.columns))
 
     print('Save the model...')
-    save_model(cv)
+    version = save_model(model, X_train.columns, {
+        'trainer': search,
+        'years': years,
+        'dtype': np.dtype(dtype).name,
+        'train_rows': int(X_train.shape[0]),
+        'best_params': cv.best_params_,
+        'cv_score': float(cv.best_score_),
+        'test_accuracy': report['accuracy'],
+        'test_r2': report['r2'],
+    })
+
+    print(f'Published model version {version}')
+
+
+def main_out_of_core(years=None, dtype=np.float64):
+    """
+    Train on the columnar store by streaming mini-batches from its memory maps, for datasets that do not fit in memory
+    """
+    script_root = os.path.dirname(os.path.abspath(__file__))
+
+    store_path = f'{script_root}/../data/processed_data'
+
+    if not os.path.exists(f'{store_path}/schema.json'):
+        raise FileNotFoundError(f'out of core training reads the columnar store, process_data.py writes {store_path}')
+
+    trainer = OutOfCoreTrainer(
+        store_path,
+        SCALE_COLUMNS,
+        partitions={'year': years} if years else None,
+        hidden_layer_sizes=(20, 20),
+        learning_rate_init=.001,
+        dtype=dtype,
+    )
+
+    print('Training out of core...')
+    classifier, scaler = trainer.fit()
+
+    print(f"epochs ran: {trainer.n_iter_}")
+    print(f"Validation score: {trainer.best_validation_score_}")
+
+    print('Evaluate the model...')
+    y_test, y_pred, segments = trainer.predict_test(SEGMENT_COLUMNS)
+
+    print(f"Test score: {np.mean(y_test == y_pred)}")
+
+    report = report_predictions(y_test, y_pred, classifier.classes_, segments)
+
+    print('Fuse the scaler into the model...')
+    model = fuse_scaler(classifier, scaler, trainer.feature_names)
+
+    print('Save the model...')
+    version = save_model(model, trainer.feature_names, {
+        'trainer': 'out_of_core',
+        'years': years,
+        'dtype': np.dtype(dtype).name,
+        'epochs': trainer.n_iter_,
+        'validation_score': float(trainer.best_validation_score_),
+        'test_accuracy': report['accuracy'],
+        'test_r2': report['r2'],
+    })
+
+    print(f'Published model version {version}')
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description='Train the classifier on processed_data')
+    parser.add_argument('--years', type=int, nargs='*', default=None,
+                        help='only train on these years of a store partitioned by process_data.py --input')
+    parser.add_argument('--search', choices=['halving', 'grid'], default='halving',
+                        help='successive halving over training epochs, or the exhaustive grid search')
+    parser.add_argument('--budget', type=float, default=None,
+                        help='seconds after which the halving search stops training candidates')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='CV worker processes, by default the number of cores divided by --threads')
+    parser.add_argument('--threads', type=int, default=1, help='BLAS threads per CV worker')
+    parser.add_argument('--out-of-core', action='store_true',
+                        help='stream mini-batches from the columnar store instead of loading the dataset, no search')
+    parser.add_argument('--no-split-cache', dest='split_cache', action='store_false',
+                        help='split and scale the dataset again instead of using the cached split in .cache/splits')
+    parser.add_argument('--float32', action='store_true',
+                        help='train, export and serve the model in float32, writes a parity report against float64')
+
+    main(**vars(parser.parse_args()))
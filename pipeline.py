@@ -0,0 +1,434 @@
+# import libraries
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from importlib import metadata
+
+from data.columnar import read_schema
+from data.digest import file_digest
+from models import registry
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Pipeline stages in the order they run. Keys:
+#   name     - stage name, also the name of its directory in the cache
+#   script   - script that runs the stage
+#   code     - source files the stage depends on, any change invalidates it
+#   inputs   - files the stage reads, keyed by content so a rewrite with the same content is still a cache hit
+#   outputs  - files and directories the stage writes, stored in and restored from the cache
+#   packages - installed packages whose version is part of the key
+#   models   - model artifacts among the outputs the stage publishes to the model registry. A cache hit makes the
+#              restored ones the current registry version as well, so the web app serves what the cache restored
+STAGES = [
+    {
+        'name': 'process_data',
+        'script': 'data/process_data.py',
+        'code': ['data/process_data.py', 'data/columnar.py', 'data/schema.py', 'data/instrumentation.py'],
+        'inputs': ['data/data.csv'],
+        'outputs': ['data/processed_data.csv', 'data/processed_data', 'data/processed_state.json'],
+        'packages': ['numpy', 'pandas'],
+    },
+    {
+        'name': 'train_classifier',
+        'script': 'models/train_classifier.py',
+        'code': ['models/train_classifier.py', 'models/halving_search.py', 'models/out_of_core.py',
+                 'models/split_cache.py', 'models/evaluation.py', 'models/registry.py', 'data/columnar.py',
+                 'data/schema.py', 'data/process_data.py', 'data/instrumentation.py', 'data/digest.py'],
+        'inputs': ['data/processed_data.csv', 'data/processed_data'],
+        'outputs': ['models/model.sav', 'models/model.npz', 'models/evaluation'],
+        'packages': ['numpy', 'pandas', 'scikit-learn', 'joblib', 'matplotlib'],
+        'models': {'model.sav': 'models/model.sav', 'model.npz': 'models/model.npz'},
+    },
+]
+
+
+class DigestCache:
+    """
+    Content digests of files, recomputed only when a file's size, mtime or inode changed since it was last hashed
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.digests = {}
+
+        if os.path.exists(file_path):
+            with open(file_path) as file:
+                self.digests = json.load(file)
+
+    def file_digest(self, path):
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+
+        cached = self.digests.get(path)
+
+        if cached is not None and cached['signature'] == signature:
+            return cached['digest']
+
+        self.digests[path] = {'signature': signature, 'digest': file_digest(path)}
+
+        return self.digests[path]['digest']
+
+    def path_digest(self, path):
+        """
+        Digest of a file, a columnar store (see store_digest), or of the relative names and contents of every file
+        under any other directory. None when missing
+        """
+        if os.path.isfile(path):
+            return self.file_digest(path)
+
+        if not os.path.isdir(path):
+            return None
+
+        schema = read_schema(path)
+
+        if schema is not None:
+            return self.store_digest(path, schema)
+
+        digest = hashlib.sha256()
+
+        for directory, directories, files in sorted(os.walk(path)):
+            directories.sort()
+
+            for name in sorted(files):
+                file_path = os.path.join(directory, name)
+
+                digest.update(os.path.relpath(file_path, path).encode())
+                digest.update(self.file_digest(file_path).encode())
+
+        return digest.hexdigest()
+
+    def store_digest(self, path, schema):
+        """
+        Digest of the columns of a columnar store and of the rows, partition and column contents of its parts, in
+        order. Every write names its parts randomly, so part names are left out and rewriting the same data gives the
+        same digest. Files the schema does not list, e.g. of an aborted write, are ignored
+        """
+        digest = hashlib.sha256(json.dumps(schema['columns'], sort_keys=True).encode())
+
+        for part in schema['parts']:
+            digest.update(json.dumps([part['rows'], part.get('partition')], sort_keys=True).encode())
+
+            for column in schema['columns']:
+                digest.update(self.file_digest(f"{path}/{part['name']}/{column['name']}.bin").encode())
+
+        return digest.hexdigest()
+
+    def save(self):
+        # parts replaced by a later write are gone, their digests would only grow the file
+        self.digests = {path: cached for path, cached in self.digests.items() if os.path.exists(path)}
+
+
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+        with open(f'{self.file_path}.tmp', 'w') as file:
+            json.dump(self.digests, file)
+
+        os.replace(f'{self.file_path}.tmp', self.file_path)
+
+
+def stage_key(stage, args, digests):
+    """
+    Cache key of a stage, a hash of its code, inputs, arguments and package versions
+
+    INPUT
+    stage - dict, entry of STAGES
+    args - list of command line arguments the stage script is run with
+    digests - DigestCache
+
+    OUTPUT
+    key - str
+    components - dict, what the key was computed from
+    """
+    components = {
+        'code': {path: digests.path_digest(f'{ROOT_DIR}/{path}') for path in stage['code']},
+        'inputs': {path: digests.path_digest(f'{ROOT_DIR}/{path}') for path in stage['inputs']},
+        'args': args,
+        'python': sys.version.split()[0],
+        'packages': {package: package_version(package) for package in stage['packages']},
+    }
+
+    missing = [path for path, digest in components['inputs'].items() if digest is None]
+
+    if missing:
+        raise FileNotFoundError(f"{stage['name']} inputs are missing: {', '.join(missing)}")
+
+    key = hashlib.sha256(json.dumps(components, sort_keys=True).encode()).hexdigest()
+
+    return key, components
+
+
+def package_version(package):
+    try:
+        return metadata.version(package)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def copy_path(source, target):
+    """
+    Copy a file or directory next to target and swap it in, so target is never partially written
+
+    INPUT
+    source - file or directory to copy
+    target - path it is copied to
+    """
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+
+    tmp_target = f'{target}.tmp-{uuid.uuid4().hex[:8]}'
+
+    if os.path.isdir(source):
+        shutil.copytree(source, tmp_target)
+
+        # a directory cannot be replaced atomically, move the old one out of the way first
+        if os.path.exists(target):
+            old_target = f'{target}.old-{uuid.uuid4().hex[:8]}'
+
+            os.replace(target, old_target)
+            os.replace(tmp_target, target)
+
+            shutil.rmtree(old_target)
+        else:
+            os.replace(tmp_target, target)
+    else:
+        shutil.copy2(source, tmp_target)
+
+        os.replace(tmp_target, target)
+
+
+def restore_outputs(stage, entry_path, manifest, digests):
+    """
+    Restore the cached outputs of a stage, outputs that already have the cached content are left as they are
+
+    INPUT
+    stage - dict, entry of STAGES
+    entry_path - cache directory of the entry
+    manifest - dict, manifest of the entry
+    digests - DigestCache
+    """
+    for path in stage['outputs']:
+        if digests.path_digest(f'{ROOT_DIR}/{path}') != manifest['outputs'][path]:
+            copy_path(f'{entry_path}/outputs/{path}', f'{ROOT_DIR}/{path}')
+
+
+def store_outputs(stage, key, components, seconds, stage_path, digests):
+    """
+    Copy the outputs of a stage that just ran into the cache, along with the metadata of the model version it published
+
+    INPUT
+    stage - dict, entry of STAGES
+    key - cache key of the stage
+    components - dict, what the key was computed from
+    seconds - how long the stage ran
+    stage_path - cache directory of the stage
+    digests - DigestCache
+    """
+    tmp_entry_path = f'{stage_path}/{key}.tmp-{uuid.uuid4().hex[:8]}'
+
+    manifest = {
+        'stage': stage['name'],
+        'key': key,
+        'created': time.time(),
+        'seconds': seconds,
+        'components': components,
+        'outputs': {},
+    }
+
+    if 'models' in stage and registry.read_current() is not None:
+        manifest['model_metadata'] = registry.read_metadata(registry.read_current()['version'])
+
+    for path in stage['outputs']:
+        if not os.path.exists(f'{ROOT_DIR}/{path}'):
+            raise FileNotFoundError(f"{stage['name']} did not write {path}")
+
+        copy_path(f'{ROOT_DIR}/{path}', f'{tmp_entry_path}/outputs/{path}')
+
+        manifest['outputs'][path] = digests.path_digest(f'{ROOT_DIR}/{path}')
+
+    with open(f'{tmp_entry_path}/manifest.json', 'w') as file:
+        json.dump(manifest, file, indent=4)
+
+    # the entry only becomes visible once it is complete
+    if os.path.exists(f'{stage_path}/{key}'):
+        shutil.rmtree(f'{stage_path}/{key}')
+
+    os.replace(tmp_entry_path, f'{stage_path}/{key}')
+
+
+def serve_restored_models(stage, manifest):
+    """
+    Make the model artifacts a cache hit restored the current registry version. The version that holds exactly these
+    artifacts is activated, when the registry no longer has one they are published again with the metadata of the run
+    that trained them
+
+    INPUT
+    stage - dict, entry of STAGES
+    manifest - dict, manifest of the restored entry
+
+    OUTPUT
+    version - str, the current registry version
+    """
+    artifacts = {name: f'{ROOT_DIR}/{path}' for name, path in stage['models'].items()}
+
+    checksums = {name: file_digest(file_path) for name, file_path in artifacts.items()}
+
+    for published in reversed(registry.versions()):
+        if {name: artifact['sha256'] for name, artifact in published['artifacts'].items()} == checksums:
+            current = registry.read_current()
+
+            if current is None or current['version'] != published['version']:
+                registry.activate(published['version'])
+
+            return published['version']
+
+    model_metadata = {
+        name: value for name, value in manifest.get('model_metadata', {}).items()
+        if name not in ('version', 'created', 'artifacts')
+    }
+
+    return registry.publish(artifacts, {**model_metadata, 'restored_from': manifest['key']})
+
+
+def read_manifest(entry_path):
+    if not os.path.exists(f'{entry_path}/manifest.json'):
+        return None
+
+    with open(f'{entry_path}/manifest.json') as file:
+        return json.load(file)
+
+
+def run_stage(stage, args, cache_dir, digests, force=False):
+    """
+    Restore a stage from the cache, or run it and cache its outputs
+
+    INPUT
+    stage - dict, entry of STAGES
+    args - list of command line arguments for the stage script
+    cache_dir - cache root directory
+    digests - DigestCache
+    force - run the stage even when it is cached
+
+    OUTPUT
+    result - dict with the stage name, hit, miss or forced, its key and the seconds it took
+    """
+    start = time.perf_counter()
+
+    key, components = stage_key(stage, args, digests)
+
+    stage_path = f"{cache_dir}/{stage['name']}"
+    entry_path = f'{stage_path}/{key}'
+
+    manifest = read_manifest(entry_path)
+
+    if manifest is not None and not force:
+        print(f"{stage['name']}: cache hit {key[:12]}, restoring outputs...")
+
+        restore_outputs(stage, entry_path, manifest, digests)
+
+        if 'models' in stage:
+            print(f"{stage['name']}: serving model version {serve_restored_models(stage, manifest)}")
+
+        return {'stage': stage['name'], 'result': 'hit', 'key': key, 'seconds': time.perf_counter() - start}
+
+    print(f"{stage['name']}: cache {'bypassed' if force else 'miss'} {key[:12]}, running {stage['script']}...")
+
+    # figures are saved rather than shown when the pipeline runs unattended
+    env = {**os.environ, 'MPLBACKEND': os.environ.get('MPLBACKEND', 'Agg')}
+
+    subprocess.run([sys.executable, f"{ROOT_DIR}/{stage['script']}", *args], cwd=ROOT_DIR, env=env, check=True)
+
+    seconds = time.perf_counter() - start
+
+    os.makedirs(stage_path, exist_ok=True)
+
+    store_outputs(stage, key, components, seconds, stage_path, digests)
+
+    return {'stage': stage['name'], 'result': 'forced' if force else 'miss', 'key': key, 'seconds': seconds}
+
+
+def print_report(results):
+    print()
+    print(f"{'stage':<20}{'result':<10}{'key':<16}{'seconds':>10}")
+
+    for result in results:
+        print(f"{result['stage']:<20}{result['result']:<10}{result['key'][:12]:<16}{result['seconds']:>10.2f}")
+
+
+def train_args(years=None, search=None, budget=None, jobs=None, threads=None, out_of_core=False, float32=False):
+    """
+    Command line arguments for train_classifier.py, only the options that were set so the default run keeps its key
+    """
+    args = []
+
+    if years:
+        args += ['--years', *[str(year) for year in years]]
+
+    for option, value in [('--search', search), ('--budget', budget), ('--jobs', jobs), ('--threads', threads)]:
+        if value is not None:
+            args += [option, str(value)]
+
+    if out_of_core:
+        args.append('--out-of-core')
+
+    if float32:
+        args.append('--float32')
+
+    return args
+
+
+def main(chunksize=None, years=None, search=None, budget=None, jobs=None, threads=None, out_of_core=False,
+         float32=False, force=None, cache_dir=None):
+    cache_dir = cache_dir or f'{ROOT_DIR}/.cache/pipeline'
+    force = force or []
+
+    unknown = set(force) - {stage['name'] for stage in STAGES}
+
+    if unknown:
+        raise ValueError(f"unknown stages {', '.join(sorted(unknown))}")
+
+    stage_args = {
+        'process_data': ['--chunksize', str(chunksize)] if chunksize else [],
+        'train_classifier': train_args(years, search, budget, jobs, threads, out_of_core, float32),
+    }
+
+    digests = DigestCache(f'{cache_dir}/digests.json')
+
+    results = []
+
+    try:
+        for stage in STAGES:
+            results.append(
+                run_stage(stage, stage_args.get(stage['name'], []), cache_dir, digests, stage['name'] in force))
+    except subprocess.CalledProcessError as error:
+        print(f'{os.path.relpath(error.cmd[1], ROOT_DIR)} failed with exit code {error.returncode}')
+
+        print_report(results)
+
+        sys.exit(error.returncode)
+    finally:
+        digests.save()
+
+    print_report(results)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Run the ETL and training stages, skipping stages whose code, inputs and arguments are unchanged')
+    parser.add_argument('--chunksize', type=int, default=None, help='passed on to process_data.py')
+    parser.add_argument('--years', type=int, nargs='*', default=None, help='passed on to train_classifier.py')
+    parser.add_argument('--search', choices=['halving', 'grid'], default=None, help='passed on to train_classifier.py')
+    parser.add_argument('--budget', type=float, default=None, help='passed on to train_classifier.py')
+    parser.add_argument('--jobs', type=int, default=None, help='passed on to train_classifier.py')
+    parser.add_argument('--threads', type=int, default=None, help='passed on to train_classifier.py')
+    parser.add_argument('--out-of-core', action='store_true', help='passed on to train_classifier.py')
+    parser.add_argument('--float32', action='store_true', help='passed on to train_classifier.py')
+    parser.add_argument('--force', nargs='*', default=[], metavar='STAGE',
+                        help='run these stages even when they are cached')
+    parser.add_argument('--cache-dir', default=None, help='cache directory, .cache/pipeline by default')
+
+    main(**vars(parser.parse_args()))
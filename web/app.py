@@ -1,18 +1,122 @@
+import json
 import os
 import joblib
-import re
 import numpy as np
-import pandas as pd
 
-from flask import Flask, render_template, request
+from data.columnar import SCHEMA_FILE, load_columnar
+from data.schema import read_processed_csv
+from flask import Flask, abort, jsonify, render_template, request
 from datetime import datetime
+from models.registry import REGISTRY_DIR
+from web.providers.ChartsProvider import ChartsProvider
+from web.providers.DatasetStore import DatasetStore
+from web.providers.MLPPredictor import MLPPredictor
+from web.providers.ModelStore import ModelStore
 from web.providers.ResultsProvider import ResultsProvider
+from web.providers.ScoringEngine import ScoringEngine
+from web.providers.ScoringProvider import ScoringProvider
+from web.providers.StatsIndex import StatsIndex
 
 # Set the web root directory
 WEB_ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Load model
-model = joblib.load(f'{WEB_ROOT_DIR}/../models/model.sav')
+# Model registry train_classifier.py publishes every model to, its current version is swapped in while serving
+MODEL_REGISTRY_DIR = os.environ.get('MODEL_REGISTRY_DIR', REGISTRY_DIR)
+
+
+def load_model(model_dir):
+    # prefer the numpy artifact exported by train_classifier.py over unpickling the full GridSearchCV
+    if os.path.exists(f'{model_dir}/model.npz'):
+        return MLPPredictor.load(f'{model_dir}/model.npz')
+
+    model = joblib.load(f'{model_dir}/model.sav')
+
+    # the form and the API send raw values, a model trained on scaled inputs would score them wrong
+    if not getattr(getattr(model, 'best_estimator_', model), 'scaler_fused_', False):
+        raise ValueError(f'{model_dir}/model.sav has no fused scaler, retrain it with models/train_classifier.py')
+
+    return model
+
+
+model_store = ModelStore(
+    MODEL_REGISTRY_DIR,
+    loader=load_model,
+    check_interval=float(os.environ.get('MODEL_CHECK_INTERVAL', 5.0)),
+    # models trained before the registry existed
+    fallback=lambda: load_model(f'{WEB_ROOT_DIR}/../models'),
+)
+
+model_store.refresh()
+
+scoring_provider = ScoringProvider(model_store)
+
+# Concurrent scoring calls in a worker are coalesced into one model call. The window (ms) and batch size trade latency
+# for throughput, a window of 0 scores every request on its own thread
+scoring_engine = ScoringEngine(
+    scoring_provider,
+    batch_window=float(os.environ.get('SCORING_BATCH_WINDOW_MS', 2.0)) / 1000,
+    max_batch_size=int(os.environ.get('SCORING_MAX_BATCH_SIZE', 256)),
+)
+
+# Most applications accepted by a single /api/v1/score call
+SCORE_MAX_BATCH = int(os.environ.get('SCORE_MAX_BATCH', 10000))
+
+# Plot bin widths per column (json, e.g. {"property_value": 50000}) and the most bins a histogram may have
+CHART_BIN_WIDTHS = json.loads(os.environ.get('CHART_BIN_WIDTHS', '{}'))
+CHART_MAX_BINS = int(os.environ.get('CHART_MAX_BINS', 1000))
+
+# Chart payloads are keyed on the dataset version so browsers can hold on to them
+CHARTS_MAX_AGE = int(os.environ.get('CHARTS_MAX_AGE', 86400))
+
+
+def status_charts(dataset):
+    # plot payloads that only depend on the status, built once per dataset version
+    return {
+        status: ChartsProvider(dataset, status, CHART_BIN_WIDTHS, CHART_MAX_BINS).status_data()
+        for status in (0, 1)
+    }
+
+
+# Load the cleaned data once per worker, it is swapped out when process_data.py rewrites it. The columnar store is
+# memory mapped (and shared between workers through the page cache), its schema file changes on every rewrite
+COLUMNAR_SCHEMA_PATH = f'{WEB_ROOT_DIR}/../data/processed_data/{SCHEMA_FILE}'
+
+# only the columns the notes and charts are built from are loaded, in the compact dtypes of data/schema.py
+DATASET_COLUMNS = ['status', 'ltv', *StatsIndex.count_columns]
+
+# Years of a store partitioned by process_data.py --input to compare applications with (comma separated, e.g.
+# 2021,2022), all of them by default
+DATASET_YEARS = [int(year) for year in os.environ.get('DATASET_YEARS', '').split(',') if year.strip()]
+
+
+def read_columnar(schema_path):
+    partitions = {'year': DATASET_YEARS} if DATASET_YEARS else None
+
+    return load_columnar(os.path.dirname(schema_path), columns=DATASET_COLUMNS, partitions=partitions)
+
+
+def read_csv(file_path):
+    return read_processed_csv(file_path, columns=DATASET_COLUMNS)
+
+
+if os.path.exists(COLUMNAR_SCHEMA_PATH):
+    dataset_file_path, dataset_reader = COLUMNAR_SCHEMA_PATH, read_columnar
+else:
+    dataset_file_path, dataset_reader = f'{WEB_ROOT_DIR}/../data/processed_data.csv', read_csv
+
+dataset_store = DatasetStore(
+    dataset_file_path,
+    check_interval=float(os.environ.get('DATASET_CHECK_INTERVAL', 5.0)),
+    use_hash=os.environ.get('DATASET_USE_HASH', '0') == '1',
+    derived={
+        'stats_index': StatsIndex,
+        'status_charts': status_charts,
+    },
+    reader=dataset_reader,
+)
+
+if os.path.exists(dataset_store.file_path):
+    dataset_store.refresh()
 
 # Instantiate app
 app = Flask(__name__)
@@ -31,71 +135,108 @@ def index():
 # web page that handles user query and displays model results
 @app.route('/auto-write', methods=['POST'])
 def auto_write():
-    prediction_values = [
-        float(request.form['loan_limit']),
-        int(request.form['pre_approval']),
-        int(request.form['loan_type']),
-        int(request.form['loan_purpose']),
-        int(request.form['line_of_credit']),
-        int(request.form['commercial_loan']),
-        float(re.sub('[^0-9.]', '', request.form['loan_amount'])),
-        float(request.form['interest_rate']),
-        float(request.form['interest_rate_spread']),
-        float(re.sub('[^0-9.]', '', request.form['upfront_charges'])),
-        int(request.form['term']),
-        int(request.form['negative_amortization']),
-        int(request.form['interest_only']),
-        int(request.form['lump_sum_payment']),
-        float(re.sub('[^0-9.]', '', request.form['property_value'])),
-        int(request.form['construction_type']),
-        int(request.form['occupancy_type']),
-        int(request.form['property_type']),
-        int(request.form['units']),
-        float(re.sub('[^0-9.]', '', request.form['income'])),
-        int(request.form['credit_type']),
-        int(request.form['credit_score']),
-        int(request.form['co_borrower_credit_type']),
-        int(request.form['application_taken']),
-        float(request.form['ltv']),
-        int(request.form['deposit_type']),
-        float(request.form['dti']),
-    ]
+    prediction_values = scoring_provider.form_values(request.form)
 
     # use model to predict classification for query
-    status = model.predict(np.array(prediction_values).astype(float).reshape(1, -1))[0]
+    status = scoring_engine.score(np.array(prediction_values).astype(float).reshape(1, -1))[0][0]
 
-    # load the cleaned data for results plots
-    dataset = pd.read_csv(f'{WEB_ROOT_DIR}/../data/processed_data.csv')
+    # cleaned data for results notes, the plots load their data from /charts
+    snapshot = dataset_store.get()
 
-    results_provider = ResultsProvider(dataset, status, request)
+    results_provider = ResultsProvider(snapshot.derive('stats_index', StatsIndex), status, request)
 
     template_data = {
         'int': int,
         'status': status,
         'form_data': request.form,
-        'dataset': dataset,
-        'plot_data': dataset.to_json(),
+        'dataset_version': snapshot.version,
         'pre_approval_notes': results_provider.pre_approval_notes(),
         'line_of_credit_notes': results_provider.line_of_credit_notes(),
         'negative_amortization_notes': results_provider.negative_amortization_notes(),
         'upfront_charges_notes': results_provider.upfront_charges_notes(),
-        'upfront_charges_data': results_provider.upfront_charges_data(),
         'interest_only_notes': results_provider.interest_only_notes(),
         'income_notes': results_provider.income_notes(),
-        'income_data': results_provider.income_data(),
         'credit_score_notes': results_provider.credit_score_notes(),
-        'credit_score_data': results_provider.credit_score_data(),
         'property_value_notes': results_provider.property_value_notes(),
-        'property_value_data': results_provider.property_value_data(),
         'loan_amount_notes': results_provider.loan_amount_notes(),
-        'loan_amount_data': results_provider.loan_amount_data(),
         'ltv_notes': results_provider.ltv_notes(),
-        'ltv_data': results_provider.ltv_data(),
     }
 
     # This will render the results.html Please see that file.
     return render_template('results.html', **template_data)
 
 
+# pre-aggregated data for a single results page plot
+@app.route('/charts/<int:status>/<panel>')
+def charts(status, panel):
+    if status not in (0, 1):
+        abort(404)
+
+    snapshot = dataset_store.get()
+
+    status_data = snapshot.derive('status_charts', status_charts)[status]
+
+    if panel != 'ltv' and panel not in status_data:
+        abort(404)
+
+    if request.if_none_match.contains(snapshot.version):
+        response = app.response_class(status=304)
+    elif panel == 'ltv':
+        stats_index = snapshot.derive('stats_index', StatsIndex)
+
+        response = jsonify(ChartsProvider(snapshot.dataset, status, stats_index=stats_index).ltv_data(
+            request.args.get('ltv', 0.0, type=float)))
+    else:
+        response = jsonify(status_data[panel])
+
+    response.set_etag(snapshot.version)
+    response.cache_control.public = True
+    response.cache_control.max_age = CHARTS_MAX_AGE
+
+    return response
+
+
+# score a batch of applications in one model call
+@app.route('/api/v1/score', methods=['POST'])
+def score():
+    payload = request.get_json(silent=True)
+
+    # accept either a bare list or {"applications": [...]}
+    applications = payload.get('applications') if isinstance(payload, dict) else payload
+
+    if isinstance(applications, list) and len(applications) > SCORE_MAX_BATCH:
+        return jsonify({'errors': [{'message': f'at most {SCORE_MAX_BATCH} applications per request'}]}), 413
+
+    matrix, errors = scoring_provider.batch_matrix(applications)
+
+    if errors:
+        return jsonify({'errors': errors}), 400
+
+    statuses, probabilities = scoring_engine.score(matrix)
+
+    results = [
+        {
+            'status': int(status),
+            'recommendation': 'approve' if status == 1 else 'deny',
+            'probability': float(probability),
+        }
+        for status, probability in zip(statuses, probabilities)
+    ]
+
+    return jsonify({'results': results})
+
+
+# version of the model this worker scores with
+@app.route('/api/v1/model')
+def model_version():
+    current = model_store.get()
+
+    return jsonify({
+        'version': current.version,
+        'previous': model_store.previous.version if model_store.previous else None,
+        'metadata': current.metadata,
+    })
+
+
 if __name__ == '__main__':
     app.run(threaded=True, port=5000, debug=True)
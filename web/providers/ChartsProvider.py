@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class ChartsProvider:
+    # bin width per histogram column, widened further when a column would produce more than max_bins bins
+    bin_widths = {
+        'upfront_charges': 2500,
+        'income': 2500,
+        'property_value': 2500,
+        'loan_amount': 2500,
+    }
+
+    def __init__(self, dataset, status, bin_widths=None, max_bins=None, stats_index=None):
+        self.dataset = dataset
+        self.status = status
+        self.stats_index = stats_index
+        self.bin_widths = {**self.bin_widths, **(bin_widths or {})}
+        self.max_bins = max_bins
+
+    def status_data(self):
+        # every plot that depends on nothing but the status, keyed by panel
+        data = {
+            'pre-approval': self.binary_data('pre_approval'),
+            'line-of-credit': self.binary_data('line_of_credit'),
+            'negative-amortization': self.binary_data('negative_amortization'),
+            'interest-only': self.binary_data('interest_only'),
+            'upfront-charges': self.upfront_charges_data(),
+            'income': self.income_data(),
+            'credit-score': self.credit_score_data(),
+            'property-value': self.property_value_data(),
+            'loan-amount': self.loan_amount_data(),
+        }
+
+        return data
+
+    def binary_data(self, column):
+        values = self.status_values(column)
+
+        data = {
+            'values': [int(np.count_nonzero(values == 1)), int(np.count_nonzero(values == 0))],
+        }
+
+        return data
+
+    def upfront_charges_data(self):
+        return self.histogram_data('upfront_charges')
+
+    def income_data(self):
+        return self.histogram_data('income')
+
+    def credit_score_data(self):
+        values = self.status_values('credit_score')
+
+        value_counts = np.unique(values[~np.isnan(values)] if values.dtype.kind == 'f' else values,
+                                 return_counts=True)
+
+        data = {
+            'x': value_counts[0].tolist(),
+            'y': value_counts[1].tolist(),
+        }
+
+        return data
+
+    def property_value_data(self):
+        return self.histogram_data('property_value')
+
+    def loan_amount_data(self):
+        return self.histogram_data('loan_amount')
+
+    def ltv_data(self, ltv):
+        # the unique values come presorted from the stats index, only the slice past ltv is rounded and counted
+        value_counts = np.unique(np.round(self.stats_index.ltv_from(self.status, ltv), 0), return_counts=True)
+
+        data = {
+            'x': value_counts[0].tolist(),
+            'y': value_counts[1].tolist(),
+        }
+
+        return data
+
+    def histogram_data(self, column):
+        values = self.status_values(column)
+        values = values[~np.isnan(values)]
+
+        width = int(self.bin_widths[column])
+        upper = int(np.ceil(values.max())) if values.shape[0] else 0
+
+        if self.max_bins and upper / width > self.max_bins:
+            width *= int(np.ceil(upper / width / self.max_bins))
+
+        edges = np.arange(0, max(upper, 1) + width, width)
+
+        counts, edges = np.histogram(values, bins=edges)
+
+        # x is the lower edge of each bin
+        data = {
+            'x': edges[:-1].tolist(),
+            'y': counts.tolist(),
+        }
+
+        return data
+
+    def status_values(self, column):
+        return self.dataset[column].to_numpy()[self.dataset['status'].to_numpy() == self.status]
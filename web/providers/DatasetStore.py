@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+from data.digest import file_digest
+
+
+class DatasetSnapshot:
+    def __init__(self, version, dataset):
+        self.version = version
+        self.dataset = dataset
+
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derive(self, name, factory):
+        # anything built from the dataset (indexes, plot payloads) is built once and dropped along with the snapshot
+        derived = self._derived.get(name)
+
+        if derived is None:
+            with self._derived_lock:
+                derived = self._derived.get(name)
+
+                if derived is None:
+                    derived = factory(self.dataset)
+                    self._derived[name] = derived
+
+        return derived
+
+
+class DatasetStore:
+    """
+    Holds the processed dataset in memory for the lifetime of a worker
+
+    The file (or whatever reader builds from it) is re-read only when its fingerprint (mtime and size, or a content
+    hash) changes. A reload builds a complete new snapshot, including everything listed in derived, before publishing
+    it, so requests holding the previous snapshot are never affected.
+    """
+
+    def __init__(self, file_path, check_interval=5.0, use_hash=False, derived=None, reader=pd.read_csv):
+        self.file_path = file_path
+        self.reader = reader
+        self.check_interval = check_interval
+        self.use_hash = use_hash
+        self.derived = derived or {}
+
+        self._snapshot = None
+        self._fingerprint = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    def get(self):
+        snapshot = self._snapshot
+
+        if snapshot is None or time.monotonic() - self._last_check >= self.check_interval:
+            snapshot = self.refresh(block=snapshot is None)
+
+        return snapshot
+
+    def refresh(self, block=True):
+        # only one thread reloads, everyone else keeps serving the current snapshot
+        if not self._reload_lock.acquire(blocking=block):
+            return self._snapshot
+
+        try:
+            self._last_check = time.monotonic()
+
+            fingerprint = self._stat()
+
+            if self._snapshot is None or fingerprint != self._fingerprint:
+                self._load(fingerprint)
+
+            return self._snapshot
+        finally:
+            self._reload_lock.release()
+
+    def _stat(self):
+        stat = os.stat(self.file_path)
+
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load(self, fingerprint):
+        dataset = self.reader(self.file_path)
+
+        # the file was rewritten while we were reading it, keep the current snapshot and retry on the next check
+        if self._stat() != fingerprint:
+            if self._snapshot is None:
+                return self._load(self._stat())
+
+            return
+
+        version = self._version(fingerprint)
+
+        if self._snapshot is not None and version == self._snapshot.version:
+            self._fingerprint = fingerprint
+
+            return
+
+        snapshot = DatasetSnapshot(version, dataset)
+
+        for name, factory in self.derived.items():
+            snapshot.derive(name, factory)
+
+        self._snapshot = snapshot
+        self._fingerprint = fingerprint
+
+    def _version(self, fingerprint):
+        if not self.use_hash:
+            return f'{fingerprint[0]:x}-{fingerprint[1]:x}'
+
+        return file_digest(self.file_path, 'sha1')[:16]
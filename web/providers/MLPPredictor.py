@@ -0,0 +1,76 @@
+import numpy as np
+
+
+class MLPPredictor:
+    """
+    NumPy forward pass over the arrays exported by train_classifier.export_model
+
+    The StandardScaler is already folded into the first layer weights, so it takes raw model inputs and matches
+    MLPClassifier.predict/predict_proba of the saved model. It computes in the dtype of the weights, float32 for a model
+    trained with train_classifier.py --float32.
+    """
+
+    activations = {
+        'identity': lambda x: x,
+        'logistic': lambda x: 1.0 / (1.0 + np.exp(-x)),
+        'tanh': np.tanh,
+        'relu': lambda x: np.maximum(x, 0),
+    }
+
+    def __init__(self, coefs, intercepts, activation, out_activation, classes, feature_names=None):
+        self.coefs = coefs
+        self.intercepts = intercepts
+        self.activation = activation
+        self.out_activation = out_activation
+        self.classes_ = classes
+        self.feature_names = feature_names
+        self.dtype = coefs[0].dtype
+
+    @classmethod
+    def load(cls, file_path):
+        with np.load(file_path) as arrays:
+            layers = len([name for name in arrays.files if name.startswith('coef_')])
+
+            return cls(
+                coefs=[arrays[f'coef_{layer}'] for layer in range(layers)],
+                intercepts=[arrays[f'intercept_{layer}'] for layer in range(layers)],
+                activation=str(arrays['activation']),
+                out_activation=str(arrays['out_activation']),
+                classes=arrays['classes'],
+                feature_names=arrays['feature_names'].tolist(),
+            )
+
+    def forward(self, X):
+        X = np.asarray(X, dtype=self.dtype)
+
+        hidden = self.activations[self.activation]
+
+        # exp overflows to inf for very negative logits (sooner in float32), the logistic is still 0 there
+        with np.errstate(over='ignore'):
+            for coef, intercept in zip(self.coefs[:-1], self.intercepts[:-1]):
+                X = hidden(X @ coef + intercept)
+
+            X = X @ self.coefs[-1] + self.intercepts[-1]
+
+            if self.out_activation == 'softmax':
+                X = np.exp(X - X.max(axis=1, keepdims=True))
+
+                return X / X.sum(axis=1, keepdims=True)
+
+            return self.activations[self.out_activation](X)
+
+    def predict_proba(self, X):
+        output = self.forward(X)
+
+        if output.shape[1] == 1:
+            return np.hstack([1 - output, output])
+
+        return output
+
+    def predict(self, X):
+        output = self.forward(X)
+
+        if output.shape[1] == 1:
+            return self.classes_[(output[:, 0] > 0.5).astype(int)]
+
+        return self.classes_[np.argmax(output, axis=1)]
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from models.registry import read_current, read_metadata, version_path
+
+
+class ModelVersion:
+    def __init__(self, version, model, metadata):
+        self.version = version
+        self.model = model
+        self.metadata = metadata
+
+
+class ModelStore:
+    """
+    Holds the scoring model of a worker and swaps in the version the model registry points at
+
+    A background thread checks the registry pointer every check_interval seconds and loads a new version completely
+    before publishing it with a single assignment, so requests keep scoring with the version they started with and
+    are never paused by a load. The version it replaces is kept in memory: when the registry rolls back to it, the
+    worker switches back without loading anything. A version that fails to load is skipped, the worker keeps serving
+    the current one until the pointer changes again.
+
+    fallback builds the model served while the registry is empty, e.g. from the unversioned artifacts.
+    """
+
+    def __init__(self, registry_dir, loader, check_interval=5.0, fallback=None):
+        self.registry_dir = registry_dir
+        self.loader = loader
+        self.check_interval = check_interval
+        self.fallback = fallback
+
+        self._current = None
+        self._previous = None
+        self._failed = None
+        self._refresh_lock = threading.Lock()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    @property
+    def previous(self):
+        return self._previous
+
+    def get(self):
+        current = self._current
+
+        if current is None:
+            current = self.refresh()
+
+        # started lazily so it is created in the worker process, not in a pre-fork master
+        if self._thread is None or not self._thread.is_alive():
+            with self._thread_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._poll, name='model-store', daemon=True)
+                    self._thread.start()
+
+        return current
+
+    def refresh(self):
+        with self._refresh_lock:
+            pointer = read_current(self.registry_dir)
+
+            if pointer is None:
+                if self._current is None:
+                    self._current = ModelVersion(None, self.fallback(), {})
+
+                return self._current
+
+            version = pointer['version']
+
+            if self._current is not None and version == self._current.version:
+                return self._current
+
+            if self._previous is not None and version == self._previous.version:
+                # roll back (or forward again) to the version still in memory
+                self._current, self._previous = self._previous, self._current
+
+                return self._current
+
+            if version == self._failed and self._current is not None:
+                return self._current
+
+            try:
+                loaded = ModelVersion(version, self.loader(version_path(version, self.registry_dir)),
+                                      read_metadata(version, self.registry_dir))
+            except Exception as error:
+                self._failed = version
+
+                if self._current is None:
+                    raise
+
+                print(f'model store: {version} failed to load, keeping {self._current.version}, {error!r}')
+
+                return self._current
+
+            self._current, self._previous = loaded, self._current
+
+            return self._current
+
+    def _poll(self):
+        while True:
+            time.sleep(self.check_interval)
+
+            try:
+                self.refresh()
+            except Exception as error:
+                print(f'model store: could not check the registry, {error!r}')
@@ -3,8 +3,8 @@ import numpy as np
 
 
 class ResultsProvider:
-    def __init__(self, dataset, status, request):
-        self.dataset = dataset
+    def __init__(self, stats_index, status, request):
+        self.stats_index = stats_index
         self.status = status
         self.request = request
         self.status_text = "approved" if self.status == 1 else "denied"
@@ -42,15 +42,12 @@ class ResultsProvider:
 
         note = f" applications have an upfront charge of {self.request.form['upfront_charges']}"
 
-        series = self.dataset[(self.dataset['status'] == self.status) &
-                              (self.dataset['upfront_charges'] == upfront_charges)]['upfront_charges'] \
-            .value_counts(normalize=True)
+        share = self.matching_share('upfront_charges', 'upfront_charges', upfront_charges)
 
-        if series.empty or upfront_charges not in series:
+        if share is None:
             return f"0% of {self.status_text} {note}"
 
-        percentage = (series[upfront_charges] / self.dataset[(self.dataset['status'] == self.status)]['upfront_charges']
-                      .shape[0]) * 100
+        percentage = (share / self.stats_index.total(self.status)) * 100
 
         percentage = np.round(percentage, 2)
 
@@ -58,17 +55,6 @@ class ResultsProvider:
 
         return note
 
-    def upfront_charges_data(self):
-        bins = range(0, int(self.dataset[self.dataset['status'] == self.status]['upfront_charges'].max()), 2500)
-
-        data = {
-            'x': [*bins],
-            'y': self.dataset[self.dataset['status'] == self.status]['upfront_charges'].value_counts(bins=bins)
-                .to_list(),
-        }
-
-        return data
-
     def interest_only_notes(self):
         note = "are interest only" if self.request.form['interest_only'] == 1 else \
             "are not interest only"
@@ -84,15 +70,12 @@ class ResultsProvider:
 
         note = f" applicants have an income of {self.request.form['income']}"
 
-        series = self.dataset[(self.dataset['status'] == self.status) &
-                              (self.dataset['income'] == income)]['income'] \
-            .value_counts(normalize=True)
+        share = self.matching_share('income', 'income', income)
 
-        if series.empty or income not in series:
+        if share is None:
             return f"0% of {self.status_text} {note}"
 
-        percentage = (series[income] / self.dataset[(self.dataset['status'] == self.status)]['income']
-                      .shape[0]) * 100
+        percentage = (share / self.stats_index.total(self.status)) * 100
 
         percentage = np.round(percentage, 4)
 
@@ -100,23 +83,11 @@ class ResultsProvider:
 
         return note
 
-    def income_data(self):
-        bins = range(0, int(self.dataset[self.dataset['status'] == self.status]['income'].max()), 2500)
-
-        data = {
-            'x': [*bins],
-            'y': self.dataset[self.dataset['status'] == self.status]['income'].value_counts(bins=bins)
-                .to_list(),
-        }
-
-        return data
-
     def credit_score_notes(self):
         credit_score = int(self.request.form['credit_score'])
 
-        percentage = self.dataset[(self.dataset['status'] == self.status) &
-                                  (self.dataset['credit_score'] == credit_score)]['credit_score'].shape[0] / \
-                     self.dataset[self.dataset['status'] == self.status]['credit_score'].shape[0]
+        percentage = self.stats_index.count(self.status, 'credit_score', credit_score) / \
+            self.stats_index.total(self.status)
 
         percentage = np.round(percentage * 100, 2)
 
@@ -124,28 +95,17 @@ class ResultsProvider:
 
         return note
 
-    def credit_score_data(self):
-        data = {
-            'x': self.dataset[self.dataset['status'] == self.status]['credit_score'].unique().tolist(),
-            'y': self.dataset[self.dataset['status'] == self.status]['credit_score'].value_counts().to_list()
-        }
-
-        return data
-
     def property_value_notes(self):
-        upfront_charges = float(re.sub('[^0-9.]', '', self.request.form['property_value']))
+        property_value = float(re.sub('[^0-9.]', '', self.request.form['property_value']))
 
         note = f" applications have a property value of {self.request.form['property_value']}"
 
-        series = self.dataset[(self.dataset['status'] == self.status) &
-                              (self.dataset['property_value'] == upfront_charges)]['property_value'] \
-            .value_counts(normalize=True)
+        share = self.matching_share('property_value', 'property_value', property_value)
 
-        if series.empty or upfront_charges not in series:
+        if share is None:
             return f"0% of {self.status_text} {note}"
 
-        percentage = (series[upfront_charges] / self.dataset[(self.dataset['status'] == self.status)]['property_value']
-                      .shape[0]) * 100
+        percentage = (share / self.stats_index.total(self.status)) * 100
 
         percentage = np.round(percentage, 2)
 
@@ -153,31 +113,17 @@ class ResultsProvider:
 
         return note
 
-    def property_value_data(self):
-        bins = range(0, int(self.dataset[self.dataset['status'] == self.status]['property_value'].max()), 2500)
-
-        data = {
-            'x': [*bins],
-            'y': self.dataset[self.dataset['status'] == self.status]['property_value'].value_counts(bins=bins)
-                .to_list(),
-        }
-
-        return data
-
     def loan_amount_notes(self):
         loan_amount = float(re.sub('[^0-9.]', '', self.request.form['loan_amount']))
 
         note = f" applications have a loan amount of {self.request.form['loan_amount']}"
 
-        series = self.dataset[(self.dataset['status'] == self.status) &
-                              (self.dataset['loan_amount'] == loan_amount)]['property_value'] \
-            .value_counts(normalize=True)
+        share = self.matching_share('loan_amount', 'property_value', loan_amount)
 
-        if series.empty or loan_amount not in series:
+        if share is None:
             return f"0% of {self.status_text} {note}"
 
-        percentage = (series[loan_amount] / self.dataset[(self.dataset['status'] == self.status)]['loan_amount']
-                      .shape[0]) * 100
+        percentage = (share / self.stats_index.total(self.status)) * 100
 
         percentage = np.round(percentage, 2)
 
@@ -185,52 +131,36 @@ class ResultsProvider:
 
         return note
 
-    def loan_amount_data(self):
-        bins = range(0, int(self.dataset[self.dataset['status'] == self.status]['loan_amount'].max()), 2500)
-
-        data = {
-            'x': [*bins],
-            'y': self.dataset[self.dataset['status'] == self.status]['loan_amount'].value_counts(bins=bins)
-                .to_list(),
-        }
-
-        return data
-
     def ltv_notes(self):
         ltv = float(self.request.form['ltv'])
 
-        series = self.dataset[(self.dataset['status'] == self.status) & (self.dataset['ltv'] >= ltv)]['ltv']\
-            .unique().tolist()
+        unique_count = self.stats_index.ltv_at_least(self.status, ltv)
 
-        if len(series) == 0:
+        if unique_count == 0:
             return f"0% of applications have an LTV of {self.request.form['ltv']} or greater"
 
-        percentage = np.round((len(series) / self.dataset[(self.dataset['status'] == self.status)]['ltv']
-                               .shape[0]) * 100, 2)
+        percentage = np.round((unique_count / self.stats_index.total(self.status)) * 100, 2)
 
         note = f"{percentage}% of {self.status_text} applications have an LTV of {self.request.form['ltv']} or greater"
 
         return note
 
-    def ltv_data(self):
-        ltv = float(self.request.form['ltv'])
-
-        series = np.round(
-            self.dataset[(self.dataset['status'] == 0) & (self.dataset['ltv'] >= ltv)]['ltv'].unique().tolist(),
-            0).tolist()
+    def binary_distribution_percentage(self, form_field):
+        percentage = np.round(
+            self.stats_index.share(self.status, form_field, int(self.request.form[form_field])) * 100, 2)
 
-        value_counts = np.unique(series, return_counts=True)
+        return percentage
 
-        data = {
-            'x': value_counts[0].tolist(),
-            'y': value_counts[1].tolist(),
-        }
+    def matching_share(self, column, value_column, value):
+        # value_counts(normalize=True)[value] of value_column over the rows where column == value
+        matching = self.stats_index.count(self.status, column, value)
 
-        return data
+        if column == value_column:
+            matched = matching
+        else:
+            matched = self.stats_index.pair_count(self.status, column, value_column, value)
 
-    def binary_distribution_percentage(self, form_field):
-        percentage = np.round(
-            self.dataset[self.dataset['status'] == self.status][form_field].value_counts(normalize=True)[
-                int(self.request.form[form_field])] * 100, 2)
+        if matched == 0:
+            return None
 
-        return percentage
+        return np.float64(matched) / matching
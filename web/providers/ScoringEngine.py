@@ -0,0 +1,107 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class PendingScore:
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.result = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class ScoringEngine:
+    """
+    Coalesces scoring calls from concurrent request threads into batched model calls
+
+    A single background thread takes the first waiting matrix and keeps collecting more for up to batch_window seconds
+    or until max_batch_size rows are queued, then scores all of them with one call. It only waits while other callers
+    are still in flight, so a lone request is scored immediately. batch_window trades latency for throughput, a window
+    of 0 bypasses the queue and scores on the calling thread.
+    """
+
+    def __init__(self, scoring_provider, batch_window=0.002, max_batch_size=256):
+        self.scoring_provider = scoring_provider
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+
+        self._queue = queue.Queue()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def score(self, matrix):
+        if self.batch_window <= 0:
+            return self.scoring_provider.score(matrix)
+
+        pending = PendingScore(matrix)
+
+        with self._lock:
+            self._in_flight += 1
+
+            # started lazily so it is created in the worker process, not in a pre-fork master
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='scoring-engine', daemon=True)
+                self._thread.start()
+
+        try:
+            self._queue.put(pending)
+            pending.done.wait()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        if pending.error is not None:
+            raise pending.error
+
+        return pending.result
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+
+            try:
+                statuses, probabilities = self.scoring_provider.score(
+                    np.concatenate([pending.matrix for pending in batch]))
+
+                offset = 0
+
+                for pending in batch:
+                    rows = pending.matrix.shape[0]
+                    pending.result = statuses[offset:offset + rows], probabilities[offset:offset + rows]
+                    offset += rows
+            except Exception as error:
+                for pending in batch:
+                    pending.error = error
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = batch[0].matrix.shape[0]
+
+        deadline = time.monotonic() + self.batch_window
+
+        while rows < self.max_batch_size:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+
+                # everyone who is waiting on a score is already in this batch
+                if remaining <= 0 or self._in_flight <= len(batch):
+                    break
+
+                try:
+                    pending = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+
+            batch.append(pending)
+            rows += pending.matrix.shape[0]
+
+        return batch
@@ -0,0 +1,116 @@
+import re
+import numpy as np
+
+
+class ScoringProvider:
+    # model inputs in training order (processed_data.csv without status) and the type each one is read as
+    features = [
+        ('loan_limit', float),
+        ('pre_approval', int),
+        ('loan_type', int),
+        ('loan_purpose', int),
+        ('line_of_credit', int),
+        ('commercial_loan', int),
+        ('loan_amount', float),
+        ('interest_rate', float),
+        ('interest_rate_spread', float),
+        ('upfront_charges', float),
+        ('term', int),
+        ('negative_amortization', int),
+        ('interest_only', int),
+        ('lump_sum_payment', int),
+        ('property_value', float),
+        ('construction_type', int),
+        ('occupancy_type', int),
+        ('property_type', int),
+        ('units', int),
+        ('income', float),
+        ('credit_type', int),
+        ('credit_score', int),
+        ('co_borrower_credit_type', int),
+        ('application_taken', int),
+        ('ltv', float),
+        ('deposit_type', int),
+        ('dti', float),
+    ]
+
+    # dollar amounts come in formatted, e.g. $116,500.00
+    currency_features = {'loan_amount', 'upfront_charges', 'property_value', 'income'}
+
+    def __init__(self, model_store):
+        self.model_store = model_store
+
+    def form_values(self, form):
+        return [self.coerce(name, kind, form[name]) for name, kind in self.features]
+
+    def batch_matrix(self, applications):
+        """
+        Validate a list of applications and coerce them into one (n, features) float matrix
+
+        Returns the matrix and a list of errors, the matrix is None when there are any errors
+        """
+        if not isinstance(applications, list) or len(applications) == 0:
+            return None, [{'message': 'expected a non-empty list of applications'}]
+
+        # in the dtype the model computes in, so it is not cast again
+        dtype = getattr(self.model_store.get().model, 'dtype', np.float64)
+
+        matrix = np.empty((len(applications), len(self.features)), dtype=dtype)
+        errors = []
+
+        for index, application in enumerate(applications):
+            if not isinstance(application, dict):
+                errors.append({'index': index, 'message': 'expected an object'})
+
+                continue
+
+            for column, (name, kind) in enumerate(self.features):
+                if name not in application:
+                    errors.append({'index': index, 'field': name, 'message': 'missing'})
+
+                    continue
+
+                try:
+                    matrix[index, column] = self.coerce(name, kind, application[name])
+                except (TypeError, ValueError):
+                    errors.append({'index': index, 'field': name, 'message': f'expected {kind.__name__}'})
+
+        if errors:
+            return None, errors
+
+        return matrix, errors
+
+    def coerce(self, name, kind, value):
+        if isinstance(value, bool):
+            raise TypeError(name)
+
+        if isinstance(value, str) and name in self.currency_features:
+            value = re.sub('[^0-9.]', '', value)
+
+        if kind is int and isinstance(value, float):
+            if not value.is_integer():
+                raise ValueError(name)
+
+            value = int(value)
+
+        value = kind(value)
+
+        if not np.isfinite(value):
+            raise ValueError(name)
+
+        return value
+
+    def score(self, matrix):
+        """
+        Score every row of the matrix with a single model call
+
+        Returns the predicted statuses and the probability of each application being approved (status 1)
+        """
+        # one version for the whole call, the store may swap in another one meanwhile
+        model = self.model_store.get().model
+
+        probabilities = model.predict_proba(matrix)
+
+        statuses = model.classes_[np.argmax(probabilities, axis=1)]
+
+        return statuses, probabilities[:, list(model.classes_).index(1)]
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class StatsIndex:
+    """
+    Per status lookup tables for the results notes, built once per dataset version
+
+    For each status it holds the row total, exact value counts for the note columns, counts of rows where a pair of
+    columns share the same value and the sorted unique LTV values.
+    """
+
+    count_columns = [
+        'pre_approval',
+        'line_of_credit',
+        'negative_amortization',
+        'interest_only',
+        'upfront_charges',
+        'income',
+        'credit_score',
+        'property_value',
+        'loan_amount',
+    ]
+
+    pair_columns = [
+        ('loan_amount', 'property_value'),
+    ]
+
+    def __init__(self, dataset):
+        self.totals = {}
+        self.non_null = {}
+        self.counts = {}
+        self.pair_counts = {}
+        self.ltv_values = {}
+
+        statuses = dataset['status'].to_numpy()
+
+        for status in np.unique(statuses):
+            rows = dataset[statuses == status]
+            status = int(status)
+
+            self.totals[status] = rows.shape[0]
+            self.non_null[status] = {}
+            self.counts[status] = {}
+            self.pair_counts[status] = {}
+
+            for column in self.count_columns:
+                values = rows[column].to_numpy()
+                values = values[~np.isnan(values)] if values.dtype.kind == 'f' else values
+
+                self.non_null[status][column] = values.shape[0]
+                self.counts[status][column] = self._value_counts(values)
+
+            for column, other_column in self.pair_columns:
+                values = rows[column].to_numpy()
+
+                self.pair_counts[status][(column, other_column)] = \
+                    self._value_counts(values[values == rows[other_column].to_numpy()])
+
+            ltv = rows['ltv'].to_numpy()
+
+            self.ltv_values[status] = np.unique(ltv[~np.isnan(ltv)])
+
+    def total(self, status):
+        return self.totals[int(status)]
+
+    def count(self, status, column, value):
+        return self.counts[int(status)][column].get(value, 0)
+
+    def share(self, status, column, value):
+        # matches value_counts(normalize=True)[value], raises KeyError when the value does not occur
+        status = int(status)
+
+        return np.float64(self.counts[status][column][value]) / self.non_null[status][column]
+
+    def pair_count(self, status, column, other_column, value):
+        return self.pair_counts[int(status)][(column, other_column)].get(value, 0)
+
+    def ltv_at_least(self, status, ltv):
+        return self.ltv_from(status, ltv).shape[0]
+
+    def ltv_from(self, status, ltv):
+        # the unique LTV values of ltv or greater, a view of the sorted values
+        values = self.ltv_values[int(status)]
+
+        return values[np.searchsorted(values, ltv, side='left'):]
+
+    @staticmethod
+    def _value_counts(values):
+        unique, counts = np.unique(values, return_counts=True)
+
+        return dict(zip(unique.tolist(), counts.tolist()))